@@ -43,11 +43,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'web.middleware.MetricsMiddleware',
+    'web.middleware.QueryCheckMiddleware',
+    'web.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'web.middleware.CartMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -56,7 +60,9 @@ ROOT_URLCONF = 'shop.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also reports render times to /metrics
+        'BACKEND': 'web.metrics.InstrumentedTemplates',
+        'NAME': 'django',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -72,19 +78,63 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'shop.wsgi.application'
 
+# Serve the index, category and product pages with the async views of
+# web.async_views, which pays off when running under ASGI (shop.asgi).
+ASYNC_CATALOG_VIEWS = False
+# Worker threads running the blocking queries of the async views, per process.
+ASYNC_CATALOG_THREADS = 8
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Seconds a thread keeps its database connection open between requests.
+DATABASE_CONN_MAX_AGE = 60
+
 DATABASES = {
     'default': { 
         'ENGINE': 'django.db.backends.mysql',
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
         'OPTIONS': {
             'read_default_file': str(BASE_DIR.joinpath('db.conf'))
         }
     }
 }
 
+# Read replicas of 'default', configured by db_replica1.conf, db_replica2.conf,
+# ... next to db.conf. Catalog reads are spread over them by ReplicaRouter.
+DATABASE_REPLICAS = []
+for replica_conf in sorted(BASE_DIR.glob('db_replica*.conf')):
+    DATABASES[replica_conf.stem[3:]] = {
+        'ENGINE': 'django.db.backends.mysql',
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'OPTIONS': {
+            'read_default_file': str(replica_conf)
+        },
+        'TEST': {
+            'MIRROR': 'default'
+        }
+    }
+    DATABASE_REPLICAS.append(replica_conf.stem[3:])
+
+DATABASE_ROUTERS = ['web.routers.ReplicaRouter']
+
+# Seconds a client keeps reading from the primary after it wrote something.
+REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Per-process memory is fine for a single worker, point this at memcached/redis
+# when running several workers so signal invalidation reaches all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shop',
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -137,6 +187,69 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
+# /metrics is served to logged in staff users, to scrapers sending
+# "Authorization: Bearer <METRICS_TOKEN>" and to the addresses in
+# METRICS_ALLOWED_IPS. Never list the address of a reverse proxy there, every
+# client it forwards arrives from that address. Every process keeps its own
+# metrics, so scrape the workers directly.
+METRICS_TOKEN = None
+METRICS_ALLOWED_IPS = []
+
+# Fingerprint the queries of every request and report query shapes repeated
+# more than QUERY_REPEAT_THRESHOLD times (N+1 patterns) and views running more
+# queries than their budget. QUERY_CHECK_RAISE turns the reports into
+# QueryBudgetExceeded errors, so the test client fails the test.
+QUERY_CHECK_ENABLED = DEBUG
+QUERY_CHECK_RAISE = False
+QUERY_REPEAT_THRESHOLD = 5
+
+# Maximum number of queries per view, by URL name.
+QUERY_BUDGETS = {
+    'index': 10,
+    'product_detail': 6,
+    'category_detail': 12,
+    'search': 4,
+    'cart': 10,
+    'add_to_cart': 18,
+    'change_quantity': 14,
+    'delete_from_cart': 15,
+    'checkout': 10,
+    'make_order': 28
+}
+
+# Queries slower than this are written with their EXPLAIN plan to SLOW_QUERY_LOG,
+# `manage.py slow_query_report` summarizes the log. None turns it off.
+SLOW_QUERY_THRESHOLD_MS = 200
+# Seconds before the same query shape is explained again.
+SLOW_QUERY_EXPLAIN_INTERVAL = 300
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'slow_queries.log')
+SLOW_QUERY_LOG_BACKUPS = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'}
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': SLOW_QUERY_LOG_BACKUPS,
+            'formatter': 'message',
+            'delay': True
+        }
+    },
+    'loggers': {
+        'web.slowqueries': {
+            'handlers': ['slow_queries'],
+            'level': 'INFO',
+            'propagate': False
+        }
+    }
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -1,10 +1,53 @@
 from django.contrib import admin
 from web.models import *
-from django.forms import ModelChoiceField, ModelForm, ValidationError
-from PIL import Image
-
-
-class NotebookAdminForm(ModelForm):
+from django.core.files.uploadedfile import UploadedFile
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.forms import ModelChoiceField, ModelForm
+from web.images import validate_image_file
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that trusts the table statistics instead of COUNT(*) for
+    unfiltered changelists of huge tables.
+    """
+
+    ESTIMATE_THRESHOLD = 100000
+
+    @cached_property
+    def count(self):
+        query = self.object_list.query
+        if not query.where:
+            estimate = self.get_estimate(self.object_list.db, self.object_list.model._meta.db_table)
+            if estimate is not None and estimate > self.ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+    def get_estimate(self, using, table):
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(
+                    'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                    [table]
+                )
+            elif connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+            else:
+                return None
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] is not None else None
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class ProductImageAdminForm(ModelForm):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -12,25 +55,28 @@ class NotebookAdminForm(ModelForm):
 
     
     def clean_image(self):
-        image = Image.open(self.cleaned_data['image'])
-        
-        min_height, min_width = Product.MIN_RESOLUTION
-        max_height, max_width = Product.MAX_RESOLUTION
-        
-        print('image size -', self.cleaned_data['image'].size)
-        if self.cleaned_data['image'].size > Product.MAX_FILE_SIZE:
-            raise ValidationError('Image\'s size is bigger than allowed 3 MB!')
-
-        if image.height < min_height or image.width < min_width:
-            raise ValidationError('Image\'s resolution is less than allowed!')
-        
-        if image.height > max_height or image.width > max_width:
-            raise ValidationError('Image\'s resolution is larger than allowed!')
-        
-        return self.cleaned_data['image']
-
-
-class NotebookAdmin(admin.ModelAdmin):
+        image = self.cleaned_data['image']
+        # An untouched image on the change form is already validated and stored.
+        if isinstance(image, UploadedFile):
+            validate_image_file(image)
+        return image
+
+
+class ProductAdmin(admin.ModelAdmin):
+
+    def get_readonly_fields(self, request, obj=None):
+        readonly_fields = super().get_readonly_fields(request, obj)
+        # The initial stock is entered on creation, deliveries go through the restock command.
+        if obj is not None:
+            readonly_fields = tuple(readonly_fields) + ('stock',)
+        return readonly_fields
+
+
+class NotebookAdminForm(ProductImageAdminForm):
+    pass
+
+
+class NotebookAdmin(ProductAdmin):
     form = NotebookAdminForm
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
@@ -39,7 +85,7 @@ class NotebookAdmin(admin.ModelAdmin):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
-class SmartphoneAdminForm(ModelForm):
+class SmartphoneAdminForm(ProductImageAdminForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -56,30 +102,7 @@ class SmartphoneAdminForm(ModelForm):
         return self.cleaned_data
 
 
-
-# class SmartphoneAdminForm(ModelForm):
-    
-#     def __init__(self, *args, **kwargs):
-#         super().__init__(*args, **kwargs)
-#         self.fields['image'].help_text = 'Minimal picture resolution - {} x {}'.format(*Product.MIN_RESOLUTION)
-
-    
-#     def clean_image(self):
-#         image = Image.open(self.cleaned_data['image'])
-        
-#         min_height, min_width = Product.MIN_RESOLUTION
-#         max_height, max_width = Product.MAX_RESOLUTION
-        
-#         if image.height < min_height or image.width < min_width:
-#             raise ValidationError('Image\'s resolution is less than allowed')
-        
-#         if image.height > max_height or image.width > max_width:
-#             raise ValidationError('Image\'s resolution is larger than allowed')
-        
-#         return self.cleaned_data['image']
-
-
-class SmartphoneAdmin(admin.ModelAdmin):
+class SmartphoneAdmin(ProductAdmin):
     
     change_form_template = 'admin.html'
     form = SmartphoneAdminForm
@@ -90,29 +113,11 @@ class SmartphoneAdmin(admin.ModelAdmin):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
-class SmartTVAdminForm(ModelForm):
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['image'].help_text = 'Minimal picture resolution - {} x {}'.format(*Product.MIN_RESOLUTION)
+class SmartTVAdminForm(ProductImageAdminForm):
+    pass
 
-    
-    def clean_image(self):
-        image = Image.open(self.cleaned_data['image'])
-        
-        min_height, min_width = Product.MIN_RESOLUTION
-        max_height, max_width = Product.MAX_RESOLUTION
-        
-        if image.height < min_height or image.width < min_width:
-            raise ValidationError('Image\'s resolution is less than allowed')
-        
-        if image.height > max_height or image.width > max_width:
-            raise ValidationError('Image\'s resolution is larger than allowed')
-        
-        return self.cleaned_data['image']
-
-
-class SmartTVAdmin(admin.ModelAdmin):
+
+class SmartTVAdmin(ProductAdmin):
     form = SmartTVAdminForm
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
@@ -121,29 +126,11 @@ class SmartTVAdmin(admin.ModelAdmin):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
-class HeadphonesAdminForm(ModelForm):
+class HeadphonesAdminForm(ProductImageAdminForm):
+    pass
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['image'].help_text = 'Minimal picture resolution - {} x {}'.format(*Product.MIN_RESOLUTION)
 
-    
-    def clean_image(self):
-        image = Image.open(self.cleaned_data['image'])
-        
-        min_height, min_width = Product.MIN_RESOLUTION
-        max_height, max_width = Product.MAX_RESOLUTION
-        
-        if image.height < min_height or image.width < min_width:
-            raise ValidationError('Image\'s resolution is less than allowed')
-        
-        if image.height > max_height or image.width > max_width:
-            raise ValidationError('Image\'s resolution is larger than allowed')
-        
-        return self.cleaned_data['image']
-
-
-class HeadphonesAdmin(admin.ModelAdmin):
+class HeadphonesAdmin(ProductAdmin):
     form = HeadphonesAdminForm
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
@@ -152,11 +139,66 @@ class HeadphonesAdmin(admin.ModelAdmin):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
+class CartAdmin(LargeTableAdmin):
+    list_display = ('id', 'owner', 'total_products', 'final_price', 'in_order', 'for_anonymous_user')
+    list_select_related = ('owner__user',)
+    list_filter = ('in_order', 'for_anonymous_user')
+    search_fields = ('=id',)
+    raw_id_fields = ('owner', 'products')
+
+
+class CartProductAdmin(LargeTableAdmin):
+    list_display = ('id', 'product', 'cart_id', 'user', 'quantity', 'final_price')
+    list_select_related = ('user__user',)
+    search_fields = ('=cart__id',)
+    raw_id_fields = ('user', 'cart')
+
+    def get_queryset(self, request):
+        # Products of a page are fetched with one IN query per product type.
+        return super().get_queryset(request).prefetch_related('content_object')
+
+    @admin.display(description='Product')
+    def product(self, obj):
+        return obj.content_object
+
+
+class CustomerAdmin(LargeTableAdmin):
+    list_display = ('id', 'user', 'phone', 'address')
+    list_select_related = ('user',)
+    search_fields = ('=user__username', '=phone')
+    raw_id_fields = ('user', 'orders')
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    fields = ('product_type', 'object_id', 'title', 'unit_price', 'quantity', 'final_price')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+class OrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'customer', 'first_name', 'last_name', 'phone', 'status', 'order_type', 'creation_date', 'delivery_date')
+    list_select_related = ('customer__user',)
+    list_filter = ('status', 'order_type')
+    search_fields = ('=id', '=phone', 'last_name')
+    raw_id_fields = ('customer', 'cart')
+    inlines = (OrderItemInline,)
+
+
+class TaskAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_after', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('=id', 'name', '=idempotency_key')
+    readonly_fields = ('created_at', 'updated_at')
+
+
 admin.site.register(Category)
-admin.site.register(Cart)
-admin.site.register(CartProduct)
-admin.site.register(Customer)
-admin.site.register(Order)
+admin.site.register(Cart, CartAdmin)
+admin.site.register(CartProduct, CartProductAdmin)
+admin.site.register(Customer, CustomerAdmin)
+admin.site.register(Order, OrderAdmin)
+admin.site.register(Task, TaskAdmin)
 admin.site.register(Notebook, NotebookAdmin)
 admin.site.register(Smartphone, SmartphoneAdmin)
 admin.site.register(SmartTV, SmartTVAdmin)
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class WebConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'web'
+
+    def ready(self):
+        from .models import Product
+        from .registry import product_types
+
+        product_types.populate(model for model in self.get_models() if issubclass(model, Product))
+
+        from . import signals, tasks  # noqa: F401
+        from .instrumentation import instrument_connections
+
+        # Management commands and the task worker run in the main thread.
+        instrument_connections()
@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import get_object_or_404, render
+from django.template.loader import render_to_string
+
+from .facets import FacetFilter
+from .instrumentation import instrument_connections
+from .mixins import CategoryDetailMixin
+from .models import Category, LatestProducts
+from .registry import product_types
+from .routers import PRIMARY
+from .utils import keyset_paginate
+from .views import CategoryDetailView, ProductDetailView
+
+
+# Async versions of the catalog pages, enabled by ASYNC_CATALOG_VIEWS. Django 3.2
+# has no async ORM, so independent queries run concurrently in worker threads.
+
+# The threads keep their database connections between calls like request
+# threads do, so the pool size bounds the connections held by the async views.
+executor = ThreadPoolExecutor(max_workers=settings.ASYNC_CATALOG_THREADS, thread_name_prefix='catalog')
+
+
+async def run_in_thread(func, *args, **kwargs):
+    """
+    Run blocking code in a worker thread, so several calls of one request can
+    wait on the database at the same time. Like around a request, connections
+    that failed or are older than CONN_MAX_AGE are closed before and after.
+    """
+    def call():
+        instrument_connections()
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    # The context carries the request's metrics and routing state into the thread.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, contextvars.copy_context().run, call)
+
+
+async def index(request):
+    categories, products = await asyncio.gather(
+        run_in_thread(Category.objects.get_categories_for_left_sidebar),
+        run_in_thread(
+            LatestProducts.objects.get_products_for_main_page,
+            'notebook', 'smartphone', 'smarttv', 'headphones', with_respect_to='notebook', count=(2, 2, 2, 2)
+        )
+    )
+    return await run_in_thread(render, request, 'base.html', {'categories': categories, 'products': products})
+
+
+def get_updated_at(model, slug):
+    return model._base_manager.using(PRIMARY).filter(slug=slug).values_list('updated_at', flat=True).first()
+
+
+async def product_detail(request, ct_model, slug):
+    product_type = product_types.get(ct_model)
+    if product_type is None:
+        raise Http404('Unknown product type %s' % ct_model)
+    model = product_type.model
+
+    updated_at, categories = await asyncio.gather(
+        run_in_thread(get_updated_at, model, slug),
+        run_in_thread(Category.objects.get_categories_for_left_sidebar)
+    )
+    if updated_at is None:
+        raise Http404('No %s found matching the query' % model._meta.verbose_name)
+
+    def render_content():
+        product = get_object_or_404(model._base_manager.using(PRIMARY).select_related('category'), slug=slug)
+        context = {'object': product, 'product': product, 'categories': categories, 'ct_model': model._meta.model_name}
+        return render_to_string(ProductDetailView.template_name, context, request)
+
+    version = ProductDetailView.get_version(model._meta.model_name, slug, updated_at, categories)
+    return await run_in_thread(ProductDetailView.get_cached_response, request, version, updated_at, render_content)
+
+
+async def category_detail(request, slug):
+    product_type = product_types.get_by_category_slug(slug)
+    if product_type is None:
+        await run_in_thread(get_object_or_404, Category, slug=slug)
+        raise Http404('Category %s has no products' % slug)
+    model = product_type.model
+    facet_filter = FacetFilter(model, request.GET)
+
+    category, categories, (products, next_cursor), facets = await asyncio.gather(
+        run_in_thread(get_object_or_404, Category, slug=slug),
+        run_in_thread(Category.objects.get_categories_for_left_sidebar),
+        run_in_thread(
+            keyset_paginate, CategoryDetailMixin.get_category_queryset(model, facet_filter),
+            request.GET.get('after'), CategoryDetailMixin.CATEGORY_PRODUCTS_PER_PAGE
+        ),
+        run_in_thread(facet_filter.get_facets, model.objects.all())
+    )
+
+    filter_query = request.GET.copy()
+    filter_query.pop('after', None)
+    context = {
+        'object': category,
+        'category': category,
+        'categories': categories,
+        'category_products': products,
+        'next_cursor': next_cursor,
+        'is_first_page': 'after' not in request.GET,
+        'facets': facets,
+        'filter_query': filter_query.urlencode()
+    }
+    return await run_in_thread(render, request, CategoryDetailView.template_name, context)
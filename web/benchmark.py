@@ -0,0 +1,312 @@
+import math
+import time
+from collections import Counter
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from .catalog import bulk_create_products
+from .images import generate_variants
+from .models import Cart, CartProduct, CatalogEntry, Category, Customer
+from .registry import product_types
+from .urls import urlpatterns
+
+
+BRANDS = ('Acme', 'Globex', 'Initech', 'Umbrella', 'Hooli', 'Stark', 'Wayne', 'Tyrell', 'Cyberdyne', 'Soylent')
+MODEL_WORDS = ('Pro', 'Air', 'Max', 'Ultra', 'Lite', 'Plus', 'Neo', 'Prime', 'Edge', 'Nova', 'Zen', 'Flex')
+DESCRIPTION_WORDS = (
+    'fast', 'light', 'durable', 'bright', 'quiet', 'compact', 'powerful', 'premium', 'budget', 'gaming',
+    'office', 'travel', 'family', 'student', 'wireless', 'metal', 'slim', 'classic', 'modern', 'smart'
+)
+
+SPEC_VALUES = {
+    'notebook': {
+        'display_type': ('IPS', 'TN', 'OLED'),
+        'processor_freq': ('2.4 GHz', '3.2 GHz', '4.1 GHz'),
+        'diagonal': ('13.3"', '14"', '15.6"', '17.3"'),
+        'video': ('Intel Iris', 'GTX 1650', 'RTX 3060'),
+        'ram': ('8 GB', '16 GB', '32 GB'),
+        'os': ('Windows 10', 'macOS', 'Linux'),
+        'battery': ('6 h', '10 h', '14 h')
+    },
+    'smartphone': {
+        'diagonal': ('5.8"', '6.1"', '6.7"'),
+        'display_type': ('OLED', 'IPS'),
+        'resolution': ('1080x2400', '1440x3200'),
+        'ram': ('4 GB', '6 GB', '8 GB', '12 GB'),
+        'sd': (True, False),
+        'sd_volume': ('128 GB', '512 GB', None),
+        'battery': ('3000 mAh', '4000 mAh', '5000 mAh'),
+        'main_cam': ('12 MP', '48 MP', '108 MP'),
+        'frontal_cam': ('8 MP', '12 MP', '32 MP')
+    },
+    'smarttv': {
+        'diagonal': ('43"', '50"', '55"', '65"', '75"'),
+        'resolution': ('Full HD', '4K', '8K'),
+        'built_in_browser': (True, False),
+        'built_in_apps': ('Netflix, YouTube', 'YouTube', None)
+    },
+    'headphones': {
+        'connection_type': ('wire', 'wireless'),
+        'fastening': ('earbuds', 'vertical_bow'),
+        'speaker_freq': ('20 Hz - 20 kHz', '10 Hz - 40 kHz'),
+        'battery': ('20 h', '30 h', None)
+    }
+}
+
+SLUG_PREFIX = 'bench'
+USERNAME_PREFIX = 'bench-user-'
+IMAGE_NAME = 'benchmark.jpg'
+# Share of products with tracked stock, the rest is unlimited.
+TRACKED_STOCK_SHARE = 0.1
+
+
+def generate_image():
+    """Store one image that every generated product points to, with its variants."""
+    content = BytesIO()
+    Image.new('RGB', (600, 600), (200, 200, 200)).save(content, 'JPEG')
+    name = default_storage.save(IMAGE_NAME, ContentFile(content.getvalue()))
+    generate_variants(name)
+    return name
+
+
+def build_benchmark_product(product_type, number, category, image, rng):
+    model = product_type.model
+    brand = rng.choice(BRANDS)
+    product = model(
+        category=category,
+        slug='%s-%s-%d' % (SLUG_PREFIX, product_type.model_name, number),
+        title='%s %s %s %d' % (brand, model._meta.verbose_name, rng.choice(MODEL_WORDS), number),
+        description=' '.join(rng.choice(DESCRIPTION_WORDS) for i in range(rng.randint(10, 40))),
+        price=Decimal(rng.randint(1000, 200000)) / 100,
+        image=image,
+        stock=rng.randint(0, 1000) if rng.random() < TRACKED_STOCK_SHARE else None,
+        **{field_name: rng.choice(values) for field_name, values in SPEC_VALUES[product_type.model_name].items()}
+    )
+    product.normalize_specs()
+    return product
+
+
+def generate_catalog(size, rng, batch_size=1000, log=None):
+    """Insert ``size`` products spread evenly over all product types."""
+    image = generate_image()
+    types = list(product_types)
+    for index, product_type in enumerate(types):
+        category, created = Category.objects.get_or_create(
+            slug=product_type.category_slug, defaults={'name': product_type.model._meta.verbose_name_plural}
+        )
+        count = size // len(types) + (1 if index < size % len(types) else 0)
+        for start in range(0, count, batch_size):
+            bulk_create_products(product_type.model, [
+                build_benchmark_product(product_type, number, category, image, rng)
+                for number in range(start, min(start + batch_size, count))
+            ])
+        if log:
+            log('Generated %d %s' % (count, product_type.model._meta.verbose_name_plural))
+    Category.objects.invalidate_left_sidebar()
+
+
+def sample_catalog(rng, size=1000):
+    """Return up to ``size`` random catalog entries without scanning the whole table."""
+    first = CatalogEntry.objects.order_by('pk').values_list('pk', flat=True).first()
+    last = CatalogEntry.objects.order_by('-pk').values_list('pk', flat=True).first()
+    if first is None:
+        return []
+    ids = rng.sample(range(first, last + 1), min(size, last - first + 1))
+    return list(CatalogEntry.objects.filter(pk__in=ids))
+
+
+@transaction.atomic
+def generate_carts(count, items, rng, log=None):
+    """Create ``count`` users, each with an open cart holding ``items`` random products."""
+    password = make_password(None)
+    User.objects.bulk_create([
+        User(username='%s%d' % (USERNAME_PREFIX, number), password=password) for number in range(count)
+    ])
+    users = User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk')
+    Customer.objects.bulk_create([Customer(user=user) for user in users])
+    customers = list(Customer.objects.filter(user__username__startswith=USERNAME_PREFIX).order_by('pk'))
+    Cart.objects.bulk_create([Cart(owner=customer) for customer in customers])
+    carts = Cart.objects.filter(owner__in=customers, in_order=False).order_by('pk')
+
+    pool = sample_catalog(rng)
+    cart_products = []
+    for cart in carts:
+        for entry in rng.sample(pool, min(items, len(pool))):
+            quantity = rng.randint(1, 3)
+            cart_products.append(CartProduct(
+                user_id=cart.owner_id, cart=cart, content_type_id=entry.content_type_id, object_id=entry.object_id,
+                quantity=quantity, final_price=entry.price * quantity
+            ))
+    CartProduct.objects.bulk_create(cart_products, batch_size=5000)
+
+    rows = CartProduct.objects.filter(cart__in=carts).values_list('pk', 'cart_id', 'quantity', 'final_price')
+    totals = {}
+    through = []
+    for pk, cart_id, quantity, final_price in rows:
+        total_products, total_price = totals.get(cart_id, (0, 0))
+        totals[cart_id] = (total_products + quantity, total_price + final_price)
+        through.append(Cart.products.through(cart_id=cart_id, cartproduct_id=pk))
+    Cart.products.through.objects.bulk_create(through, batch_size=5000)
+    for cart_id, (total_products, final_price) in totals.items():
+        Cart.objects.filter(pk=cart_id).update(total_products=total_products, final_price=final_price)
+    if log:
+        log('Generated %d carts with %d products each' % (count, items))
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted ``values``."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(latencies, queries, statuses):
+    latencies = sorted(latencies)
+    queries = sorted(queries)
+    total = sum(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': sum(count for status, count in statuses.items() if status >= 500),
+        'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+        'latency_ms': {
+            'min': round(latencies[0] * 1000, 3),
+            'mean': round(total / len(latencies) * 1000, 3),
+            'p50': round(percentile(latencies, 0.5) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'max': round(latencies[-1] * 1000, 3)
+        },
+        'throughput_rps': round(len(latencies) / total, 2) if total else None,
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'p95': percentile(queries, 0.95),
+            'max': queries[-1]
+        }
+    }
+
+
+class Benchmark:
+    """
+    Drive every route of ``web.urls`` through the test client and collect
+    latency and query counts.
+
+    Every route has a ``request_<url name>`` method returning the request to
+    time, any setup it needs (like filling a cart) runs before the clock starts.
+    Requests run one after another, so throughput is the inverse of the mean
+    latency of a single worker.
+    """
+
+    ORDER_DATA = {
+        'first_name': 'Bench', 'last_name': 'Mark', 'phone': '+10000000000', 'address': 'Benchmark street 1',
+        'order_type': 'pickup', 'delivery_date': '2030-01-01', 'order_comment': ''
+    }
+    # Run with settings.METRICS_TOKEN set to this, /metrics is not public.
+    METRICS_TOKEN = 'benchmark'
+
+    def __init__(self, rng, requests=100, warmup=10, users=20):
+        self.rng = rng
+        self.requests = requests
+        self.warmup = warmup
+        self.pool = sample_catalog(rng)
+        self.categories = list(Category.objects.values_list('slug', flat=True))
+        self.words = [word.lower() for word in BRANDS + MODEL_WORDS + DESCRIPTION_WORDS]
+        self.anonymous = Client(raise_request_exception=False)
+        self.scraper = Client(raise_request_exception=False, HTTP_AUTHORIZATION='Bearer %s' % self.METRICS_TOKEN)
+        self.clients = []
+        for user in User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('pk')[:users]:
+            client = Client(raise_request_exception=False)
+            client.force_login(user)
+            self.clients.append(client)
+
+    def run(self, log=None):
+        results = {}
+        for pattern in urlpatterns:
+            scenario = getattr(self, 'request_%s' % pattern.name, None)
+            if scenario is None:
+                results[pattern.name] = {'skipped': 'no scenario for this route'}
+                continue
+            for i in range(self.warmup):
+                self.measure(scenario)
+            latencies, queries, statuses = [], [], Counter()
+            for i in range(self.requests):
+                elapsed, query_count, status = self.measure(scenario)
+                latencies.append(elapsed)
+                queries.append(query_count)
+                statuses[status] += 1
+            results[pattern.name] = summarize(latencies, queries, statuses)
+            if log:
+                log('%-18s p50 %8.2f ms  p95 %8.2f ms  p99 %8.2f ms  %6.1f queries' % (
+                    pattern.name,
+                    results[pattern.name]['latency_ms']['p50'],
+                    results[pattern.name]['latency_ms']['p95'],
+                    results[pattern.name]['latency_ms']['p99'],
+                    results[pattern.name]['queries']['mean']
+                ))
+        return results
+
+    def measure(self, scenario):
+        client, method, url, data = scenario()
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = time.perf_counter() - start
+        return elapsed, len(context.captured_queries), response.status_code
+
+    def get_user_client(self):
+        return self.rng.choice(self.clients) if self.clients else self.anonymous
+
+    def get_product_kwargs(self):
+        entry = self.rng.choice(self.pool)
+        return {'ct_model': entry.product_type, 'slug': entry.slug}
+
+    def fill_cart(self, client):
+        kwargs = self.get_product_kwargs()
+        client.get(reverse('add_to_cart', kwargs=kwargs))
+        return kwargs
+
+    def request_index(self):
+        return self.anonymous, 'get', reverse('index'), {}
+
+    def request_product_detail(self):
+        return self.anonymous, 'get', reverse('product_detail', kwargs=self.get_product_kwargs()), {}
+
+    def request_category_detail(self):
+        return self.anonymous, 'get', reverse('category_detail', kwargs={'slug': self.rng.choice(self.categories)}), {}
+
+    def request_search(self):
+        return self.anonymous, 'get', reverse('search'), {'q': self.rng.choice(self.words)}
+
+    def request_cart(self):
+        return self.get_user_client(), 'get', reverse('cart'), {}
+
+    def request_add_to_cart(self):
+        return self.get_user_client(), 'get', reverse('add_to_cart', kwargs=self.get_product_kwargs()), {}
+
+    def request_change_quantity(self):
+        client = self.get_user_client()
+        kwargs = self.fill_cart(client)
+        return client, 'post', reverse('change_quantity', kwargs=kwargs), {'quantity': self.rng.randint(1, 3)}
+
+    def request_delete_from_cart(self):
+        client = self.get_user_client()
+        kwargs = self.fill_cart(client)
+        return client, 'get', reverse('delete_from_cart', kwargs=kwargs), {}
+
+    def request_checkout(self):
+        return self.get_user_client(), 'get', reverse('checkout'), {}
+
+    def request_make_order(self):
+        client = self.get_user_client()
+        self.fill_cart(client)
+        return client, 'post', reverse('make_order'), self.ORDER_DATA
+
+    def request_metrics(self):
+        return self.scraper, 'get', reverse('metrics'), {}
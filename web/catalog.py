@@ -0,0 +1,73 @@
+from django.db import transaction
+
+from .models import CatalogEntry, SearchTerm
+from .registry import product_types
+from .search import build_search_terms
+from .templatetags.specifications import PRODUCT_SPEC
+
+
+SPEC_SUMMARY_LENGTH = 500
+
+
+def get_spec_summary(product):
+    values = []
+    for name, field_name in PRODUCT_SPEC.get(product._meta.model_name, {}).items():
+        value = getattr(product, field_name, None)
+        if value:
+            values.append('%s: %s' % (name, value))
+    return ', '.join(values)[:SPEC_SUMMARY_LENGTH]
+
+
+def get_catalog_values(product):
+    return dict(
+        object_id=product.id,
+        product_type=product._meta.model_name,
+        category_id=product.category_id,
+        slug=product.slug,
+        title=product.title,
+        price=product.price,
+        image=product.image.name,
+        spec_summary=get_spec_summary(product),
+        updated_at=product.updated_at
+    )
+
+
+def build_catalog_entry(product, content_type_id):
+    return CatalogEntry(content_type_id=content_type_id, **get_catalog_values(product))
+
+
+def sync_catalog_entry(product):
+    values = get_catalog_values(product)
+    CatalogEntry.objects.update_or_create(
+        content_type_id=product_types.get_for_model(product).content_type_id,
+        object_id=values.pop('object_id'),
+        defaults=values
+    )
+
+
+def remove_catalog_entry(product):
+    CatalogEntry.objects.filter(
+        content_type_id=product_types.get_for_model(product).content_type_id, object_id=product.id
+    ).delete()
+
+
+def bulk_create_products(model, products):
+    """
+    Insert new products of one model together with their catalog and search
+    rows, which ``post_save`` does not maintain for bulk inserts.
+    """
+    content_type_id = product_types.get_for_model(model).content_type_id
+    with transaction.atomic():
+        model._base_manager.bulk_create(products)
+        # Not every backend returns primary keys from a bulk insert.
+        ids = dict(model._base_manager.filter(
+            slug__in=[product.slug for product in products]
+        ).values_list('slug', 'id'))
+        catalog_entries = []
+        search_terms = []
+        for product in products:
+            product.id = ids[product.slug]
+            catalog_entries.append(build_catalog_entry(product, content_type_id))
+            search_terms.extend(build_search_terms(product, content_type_id))
+        CatalogEntry.objects.bulk_create(catalog_entries)
+        SearchTerm.objects.bulk_create(search_terms, batch_size=5000)
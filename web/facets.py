@@ -0,0 +1,154 @@
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import models
+
+
+class Facet:
+    """
+    Filter on the distinct values of one indexed column.
+
+    ``label`` formats a raw value for display, choice fields show their display
+    name by default.
+    """
+
+    def __init__(self, name, verbose_name, field_name=None, label='{}'):
+        self.name = name
+        self.verbose_name = verbose_name
+        self.field_name = field_name or name
+        self.label = label
+
+    def clean(self, model, values):
+        field = model._meta.get_field(self.field_name)
+        cleaned = []
+        for value in values:
+            try:
+                cleaned.append(field.to_python(value))
+            except ValidationError:
+                continue
+        return cleaned
+
+    def filter(self, queryset, values):
+        return queryset.filter(**{'%s__in' % self.field_name: values})
+
+    def get_options(self, queryset, selected):
+        field = queryset.model._meta.get_field(self.field_name)
+        choices = dict(field.flatchoices)
+        rows = (
+            queryset.order_by()
+            .filter(**{'%s__isnull' % self.field_name: False})
+            .values_list(self.field_name)
+            .annotate(count=models.Count('id'))
+            .order_by(self.field_name)
+        )
+        return [
+            dict(value=value, label=choices.get(value) or self.get_label(value), count=count, selected=value in selected)
+            for value, count in rows
+        ]
+
+    def get_label(self, value):
+        if isinstance(value, bool):
+            return 'Yes' if value else 'No'
+        if isinstance(value, Decimal):
+            value = value.normalize()
+        return self.label.format(value)
+
+
+class PriceBandFacet(Facet):
+    """Filter on fixed price ranges, counted with a single conditional aggregate."""
+
+    BANDS = (
+        ('0-100', 0, 100),
+        ('100-300', 100, 300),
+        ('300-700', 300, 700),
+        ('700+', 700, None)
+    )
+
+    def __init__(self, name='price', verbose_name='Price', field_name='price'):
+        super().__init__(name, verbose_name, field_name)
+
+    def get_band_q(self, key):
+        for band_key, low, high in self.BANDS:
+            if band_key == key:
+                q = models.Q(**{'%s__gte' % self.field_name: low})
+                if high is not None:
+                    q &= models.Q(**{'%s__lt' % self.field_name: high})
+                return q
+        return None
+
+    def clean(self, model, values):
+        return [value for value in values if self.get_band_q(value) is not None]
+
+    def filter(self, queryset, values):
+        q = models.Q()
+        for value in values:
+            q |= self.get_band_q(value)
+        return queryset.filter(q)
+
+    def get_options(self, queryset, selected):
+        counts = queryset.order_by().aggregate(**{
+            key: models.Count('id', filter=self.get_band_q(key)) for key, low, high in self.BANDS
+        })
+        return [
+            dict(value=key, label='%s $' % key, count=counts[key], selected=key in selected)
+            for key, low, high in self.BANDS
+            if counts[key]
+        ]
+
+
+PRODUCT_FACETS = {
+    'notebook': (
+        PriceBandFacet(),
+        Facet('ram', 'RAM', 'ram_gb', label='{} GB'),
+        Facet('diagonal', 'Diagonal', 'diagonal_inches', label='{}"')
+    ),
+    'smartphone': (
+        PriceBandFacet(),
+        Facet('ram', 'RAM', 'ram_gb', label='{} GB'),
+        Facet('diagonal', 'Diagonal', 'diagonal_inches', label='{}"'),
+        Facet('sd', 'SD card')
+    ),
+    'smarttv': (
+        PriceBandFacet(),
+        Facet('diagonal', 'Diagonal', 'diagonal_inches', label='{}"')
+    ),
+    'headphones': (
+        PriceBandFacet(),
+        Facet('connection_type', 'Connection type'),
+        Facet('fastening', 'Fastening')
+    )
+}
+
+
+class FacetFilter:
+    """
+    Apply the facets selected in a query dict to a product queryset.
+
+    Every facet is counted over the products matching all *other* selected
+    facets, so options inside one facet stay combinable with OR.
+    """
+
+    def __init__(self, model, data):
+        self.model = model
+        self.facets = PRODUCT_FACETS.get(model._meta.model_name, ())
+        self.selected = {}
+        for facet in self.facets:
+            values = facet.clean(model, data.getlist(facet.name))
+            if values:
+                self.selected[facet.name] = values
+
+    def filter(self, queryset, exclude=None):
+        for facet in self.facets:
+            if facet.name != exclude and facet.name in self.selected:
+                queryset = facet.filter(queryset, self.selected[facet.name])
+        return queryset
+
+    def get_facets(self, queryset):
+        return [
+            dict(
+                name=facet.name,
+                verbose_name=facet.verbose_name,
+                options=facet.get_options(self.filter(queryset, exclude=facet.name), self.selected.get(facet.name, []))
+            )
+            for facet in self.facets
+        ]
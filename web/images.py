@@ -0,0 +1,102 @@
+import os
+from io import BytesIO
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .models import Product
+
+
+# Variant name -> target width in pixels, originals are never upscaled.
+IMAGE_VARIANTS = {
+    'cart': 120,
+    'card': 300,
+    'detail': 600
+}
+
+VARIANTS_DIR = 'variants'
+VARIANT_QUALITY = 82
+
+
+def validate_image(width, height, size):
+    min_height, min_width = Product.MIN_RESOLUTION
+    max_height, max_width = Product.MAX_RESOLUTION
+
+    if size > Product.MAX_FILE_SIZE:
+        raise ValidationError('Image\'s size is bigger than allowed 3 MB!')
+
+    if width is None or height is None:
+        raise ValidationError('Upload a valid image.')
+
+    if height < min_height or width < min_width:
+        raise ValidationError('Image\'s resolution is less than allowed!')
+
+    if height > max_height or width > max_width:
+        raise ValidationError('Image\'s resolution is larger than allowed!')
+
+
+def validate_image_file(image):
+    """
+    Validate an uploaded image without decoding it.
+
+    ``get_image_dimensions`` feeds the file to PIL's incremental parser chunk by
+    chunk and stops as soon as the header yields the size.
+    """
+    validate_image(*get_image_dimensions(image), image.size)
+
+
+def check_image_path(path):
+    """Process pool friendly variant of ``validate_image_file``, return an error message or None."""
+    try:
+        with open(path, 'rb') as image_file:
+            validate_image(*get_image_dimensions(image_file), os.path.getsize(path))
+    except OSError as exc:
+        return 'Invalid image: %s' % exc
+    except ValidationError as exc:
+        return exc.messages[0]
+    return None
+
+
+# Stored images whose variants were seen on storage, variants are never removed.
+known_variants = set()
+
+
+def get_variant_name(name, variant):
+    # The extension stays in, photo.jpg and photo.png are different images.
+    return '%s/%s_%s.jpg' % (VARIANTS_DIR, name, variant)
+
+
+def get_variant_url(name, variant):
+    return default_storage.url(get_variant_name(name, variant))
+
+
+def has_variants(name):
+    if name in known_variants:
+        return True
+    # generate_variants writes the variants in order, the last one completes the set.
+    if default_storage.exists(get_variant_name(name, list(IMAGE_VARIANTS)[-1])):
+        known_variants.add(name)
+        return True
+    return False
+
+
+def generate_variants(name):
+    """Write resized, compressed JPEG copies of a stored image for every variant."""
+    with default_storage.open(name, 'rb') as image_file:
+        with Image.open(image_file) as original:
+            original = original.convert('RGB')
+            for variant, width in IMAGE_VARIANTS.items():
+                image = original.copy()
+                if image.width > width:
+                    image.thumbnail((width, image.height * width // image.width), Image.LANCZOS)
+                content = BytesIO()
+                image.save(content, 'JPEG', quality=VARIANT_QUALITY, optimize=True, progressive=True)
+
+                variant_name = get_variant_name(name, variant)
+                if default_storage.exists(variant_name):
+                    default_storage.delete(variant_name)
+                default_storage.save(variant_name, ContentFile(content.getvalue()))
+    return name
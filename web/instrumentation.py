@@ -0,0 +1,27 @@
+from django.db import connections
+
+from .metrics import count_query
+from .queries import track_query
+from .slowqueries import install_slow_query_logger
+
+
+def instrument_connection(connection):
+    """
+    Install the execute wrappers of the metrics, the query checks and the slow
+    query log on ``connection``, once.
+
+    They stay installed for the life of the connection object, reconnects
+    included, and find the request they report to through context variables.
+    Nothing is added or removed per request, so Django's ``execute_wrapper()``
+    blocks, which remove the last wrapper on exit, cannot drop or leak them.
+    """
+    for wrapper in (count_query, track_query):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+    install_slow_query_logger(connection)
+
+
+def instrument_connections():
+    """Instrument the connections of the current thread, connection objects are per thread."""
+    for connection in connections.all():
+        instrument_connection(connection)
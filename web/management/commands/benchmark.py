@@ -0,0 +1,95 @@
+import json
+import platform
+import random
+import shutil
+import tempfile
+
+import django
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from web.benchmark import Benchmark, generate_carts, generate_catalog
+from web.models import CatalogEntry
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every route against a generated catalog in a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help='Catalog size, 1000 to 1000000 products')
+        parser.add_argument('--carts', type=int, default=50, help='Users with an open cart')
+        parser.add_argument('--cart-items', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=100, help='Timed requests per route')
+        parser.add_argument('--warmup', type=int, default=10, help='Untimed requests per route')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', default='benchmark.json', help='Where to write the JSON results')
+        parser.add_argument('--compare', help='Earlier results to compare p95 latency and query counts with')
+        parser.add_argument('--threshold', type=float, default=10.0, help='Slowdown in percent reported as a regression')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the test database and reuse its data next time')
+
+    def handle(self, *args, **options):
+        if options['products'] < 1 or options['requests'] < 1:
+            raise CommandError('--products and --requests must be positive')
+        previous = None
+        if options['compare']:
+            with open(options['compare']) as previous_file:
+                previous = json.load(previous_file)
+
+        rng = random.Random(options['seed'])
+        media_root = tempfile.mkdtemp(prefix='benchmark-media-')
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            with override_settings(MEDIA_ROOT=media_root, METRICS_TOKEN=Benchmark.METRICS_TOKEN):
+                if CatalogEntry.objects.exists():
+                    self.stdout.write('Reusing the data of the kept test database')
+                else:
+                    generate_catalog(options['products'], rng, log=self.stdout.write)
+                    generate_carts(options['carts'], options['cart_items'], rng, log=self.stdout.write)
+                cache.clear()
+                routes = Benchmark(rng, options['requests'], options['warmup']).run(log=self.stdout.write)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        results = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'products': options['products'],
+                'carts': options['carts'],
+                'cart_items': options['cart_items'],
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'seed': options['seed']
+            },
+            'routes': routes
+        }
+        with open(options['output'], 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+        self.stdout.write(self.style.SUCCESS('Results written to %s' % options['output']))
+
+        if previous:
+            self.compare(previous, results, options['threshold'])
+
+    def compare(self, previous, results, threshold):
+        for name, current in results['routes'].items():
+            before = previous.get('routes', {}).get(name)
+            if 'latency_ms' not in current or not before or 'latency_ms' not in before:
+                continue
+            old_p95, new_p95 = before['latency_ms']['p95'], current['latency_ms']['p95']
+            change = (new_p95 - old_p95) / old_p95 * 100 if old_p95 else 0
+            line = '%-18s p95 %8.2f -> %8.2f ms (%+.1f%%)  queries %.1f -> %.1f' % (
+                name, old_p95, new_p95, change, before['queries']['mean'], current['queries']['mean']
+            )
+            if change > threshold or current['queries']['mean'] > before['queries']['mean']:
+                self.stdout.write(self.style.ERROR(line + '  REGRESSION'))
+            else:
+                self.stdout.write(line)
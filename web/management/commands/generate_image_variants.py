@@ -0,0 +1,26 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+from web.images import generate_variants, has_variants
+from web.models import CatalogEntry
+
+
+class Command(BaseCommand):
+    help = 'Generate the resized variants of product images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate existing variants too')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes, CPU count by default')
+
+    def handle(self, *args, **options):
+        names = (
+            name for name in CatalogEntry.objects.order_by().values_list('image', flat=True).distinct().iterator()
+            if name and (options['force'] or not has_variants(name))
+        )
+        generated = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            for name in pool.map(generate_variants, names, chunksize=16):
+                generated += 1
+        self.stdout.write(self.style.SUCCESS('Generated variants for %d images' % generated))
@@ -0,0 +1,149 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import BooleanField
+
+from web.catalog import bulk_create_products
+from web.images import check_image_path, generate_variants
+from web.models import Category
+from web.registry import product_types
+
+
+class Command(BaseCommand):
+    help = 'Stream products from a CSV or JSON Lines file into the product tables in batches'
+
+    TRUE_VALUES = ('1', 't', 'true', 'y', 'yes')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file, one product per row')
+        parser.add_argument('--type', dest='product_type', help='Product type of rows without a "type" column')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Input format, guessed from the extension by default')
+        parser.add_argument('--image-dir', default='.', help='Directory that relative image paths are resolved against')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--workers', type=int, default=None, help='Image processing processes, CPU count by default')
+
+    def handle(self, *args, **options):
+        self.default_type = options['product_type']
+        if self.default_type and product_types.get(self.default_type) is None:
+            raise CommandError('Unknown product type %s' % self.default_type)
+
+        self.image_dir = options['image_dir']
+        self.category_ids = dict(
+            Category.objects.filter(slug__in=[t.category_slug for t in product_types]).values_list('slug', 'id')
+        )
+        self.created = self.skipped = 0
+
+        input_format = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.json')) else 'csv')
+        with open(options['path'], newline='', encoding='utf-8') as input_file:
+            rows = self.read_jsonl(input_file) if input_format == 'jsonl' else self.read_csv(input_file)
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    self.import_batch(batch, pool)
+
+        Category.objects.invalidate_left_sidebar()
+        self.stdout.write(self.style.SUCCESS('Imported %d products, skipped %d rows' % (self.created, self.skipped)))
+
+    def read_csv(self, input_file):
+        for line, row in enumerate(csv.DictReader(input_file), start=2):
+            yield line, row
+
+    def read_jsonl(self, input_file):
+        for line, text in enumerate(input_file, start=1):
+            if text.strip():
+                try:
+                    row = json.loads(text)
+                except ValueError as exc:
+                    yield line, exc
+                    continue
+                if isinstance(row, dict):
+                    yield line, row
+                else:
+                    yield line, ValueError('Expected a JSON object, got %s' % type(row).__name__)
+
+    def skip(self, line, error):
+        self.skipped += 1
+        self.stderr.write('Line %d: %s' % (line, error))
+
+    def build_product(self, row):
+        product_type = product_types.get(row.pop('type', None) or self.default_type)
+        if product_type is None:
+            raise ValidationError('Unknown or missing product type')
+        if product_type.category_slug not in self.category_ids:
+            raise ValidationError('Category %s does not exist' % product_type.category_slug)
+
+        model = product_type.model
+        values = {}
+        for field in model._meta.concrete_fields:
+            value = row.get(field.name)
+            if not field.editable or field.name in ('id', 'category') or value in (None, ''):
+                continue
+            if isinstance(field, BooleanField) and isinstance(value, str):
+                value = value.strip().lower() in self.TRUE_VALUES
+            values[field.name] = value
+        product = model(category_id=self.category_ids[product_type.category_slug], **values)
+        product.full_clean(exclude=['category', 'image'], validate_unique=False)
+        return product
+
+    def import_batch(self, batch, pool):
+        products = []
+        image_paths = []
+        for line, row in batch:
+            if isinstance(row, Exception):
+                self.skip(line, row)
+                continue
+            try:
+                product = self.build_product(dict(row))
+            except ValidationError as exc:
+                self.skip(line, '; '.join(exc.messages))
+                continue
+            products.append((line, product))
+            image_paths.append(os.path.join(self.image_dir, product.image.name or ''))
+
+        images = []
+        for (line, product), path, error in zip(products, image_paths, pool.map(check_image_path, image_paths, chunksize=32)):
+            if error:
+                self.skip(line, error)
+            else:
+                images.append((line, product, path))
+
+        by_model = {}
+        for line, product, path in images:
+            by_model.setdefault(type(product), []).append((line, product, path))
+        image_names = []
+        for model, model_products in by_model.items():
+            image_names.extend(self.insert_products(model, model_products))
+        # Resizing is CPU bound, so it is spread over the pool as well.
+        list(pool.map(generate_variants, image_names, chunksize=16))
+
+    def insert_products(self, model, model_products):
+        existing = set(model._base_manager.filter(
+            slug__in=[product.slug for line, product, path in model_products]
+        ).values_list('slug', flat=True))
+
+        products = []
+        for line, product, path in model_products:
+            if product.slug in existing:
+                self.skip(line, 'Product with slug %s already exists' % product.slug)
+                continue
+            existing.add(product.slug)
+            with open(path, 'rb') as image_file:
+                product.image = default_storage.save(os.path.basename(path), File(image_file))
+            product.normalize_specs()
+            products.append(product)
+        if not products:
+            return []
+
+        bulk_create_products(model, products)
+        self.created += len(products)
+        return [product.image.name for product in products]
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from web.catalog import build_catalog_entry
+from web.models import CatalogEntry
+from web.registry import product_types
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized product catalog table from the product models'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for product_type in product_types:
+            content_type_id = product_type.content_type_id
+            CatalogEntry.objects.filter(content_type_id=content_type_id).delete()
+
+            batch = []
+            synced = 0
+            for product in product_type.model._base_manager.order_by('id').iterator(chunk_size=batch_size):
+                batch.append(build_catalog_entry(product, content_type_id))
+                synced += 1
+                if len(batch) == batch_size:
+                    self.flush(batch)
+                    batch = []
+            self.flush(batch)
+            self.stdout.write('Synced %d %s' % (synced, product_type.model._meta.verbose_name_plural))
+
+    def flush(self, batch):
+        with transaction.atomic():
+            CatalogEntry.objects.bulk_create(batch)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from web.models import SearchTerm
+from web.registry import product_types
+from web.search import build_search_terms
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for product_type in product_types:
+            content_type_id = product_type.content_type_id
+            SearchTerm.objects.filter(content_type_id=content_type_id).delete()
+
+            indexed = 0
+            batch = []
+            for product in product_type.model._base_manager.order_by('id').iterator(chunk_size=batch_size):
+                batch.extend(build_search_terms(product, content_type_id))
+                indexed += 1
+                if indexed % batch_size == 0:
+                    self.flush(batch, batch_size)
+                    batch = []
+            self.flush(batch, batch_size)
+            self.stdout.write('Indexed %d %s' % (indexed, product_type.model._meta.verbose_name_plural))
+
+    def flush(self, batch, batch_size):
+        with transaction.atomic():
+            SearchTerm.objects.bulk_create(batch, batch_size=batch_size)
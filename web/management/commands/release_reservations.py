@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from web.stock import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = 'Give the stock of expired cart reservations back, meant to run from cron every minute'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        released = 0
+        while True:
+            count = release_expired_reservations(options['batch_size'])
+            released += count
+            if count < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS('Released %d reservations' % released))
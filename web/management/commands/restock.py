@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from web.registry import product_types
+from web.stock import restock
+
+
+class Command(BaseCommand):
+    help = 'Add delivered units to the stock of a product'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ct_model', help='Product type, e.g. notebook')
+        parser.add_argument('slug')
+        parser.add_argument('quantity', type=int)
+
+    def handle(self, *args, **options):
+        product_type = product_types.get(options['ct_model'])
+        if product_type is None:
+            raise CommandError('Unknown product type %s' % options['ct_model'])
+        if options['quantity'] <= 0:
+            raise CommandError('Quantity must be positive')
+
+        model = product_type.model
+        product_id = model._base_manager.filter(slug=options['slug']).values_list('id', flat=True).first()
+        if product_id is None or not restock(model, product_id, options['quantity']):
+            raise CommandError('No %s with slug %s' % (model._meta.verbose_name, options['slug']))
+        stock = model._base_manager.values_list('stock', flat=True).get(pk=product_id)
+        self.stdout.write(self.style.SUCCESS('%s has %d units in stock' % (options['slug'], stock)))
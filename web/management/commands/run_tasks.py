@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from web.queue import claim_tasks, run_task
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks, several workers may run side by side'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10, help='Tasks claimed per poll')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit as soon as the queue is empty')
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        try:
+            while True:
+                close_old_connections()
+                tasks = claim_tasks(options['batch_size'])
+                for task in tasks:
+                    if run_task(task):
+                        done += 1
+                    else:
+                        failed += 1
+                        self.stderr.write('Task %s #%d failed, attempt %d of %d' % (
+                            task.name, task.pk, task.attempts, task.max_attempts
+                        ))
+                if not tasks:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Ran %d tasks, %d failed' % (done + failed, failed)))
@@ -0,0 +1,47 @@
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from web.slowqueries import get_index_hints, get_index_prefixes, read_slow_query_log
+
+
+class Command(BaseCommand):
+    help = 'Summarize the slow query log, query shapes with the most total time first'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG, help='Slow query log, rotated backups are read too')
+        parser.add_argument('--top', type=int, default=10)
+
+    def handle(self, *args, **options):
+        shapes = {}
+        for entry in read_slow_query_log(options['log'], settings.SLOW_QUERY_LOG_BACKUPS):
+            shape = shapes.setdefault(entry['fingerprint'], {
+                'count': 0, 'total': 0.0, 'max': 0.0, 'routes': Counter(), 'sql': None, 'explain': None
+            })
+            shape['count'] += 1
+            shape['total'] += entry['duration_ms']
+            shape['max'] = max(shape['max'], entry['duration_ms'])
+            shape['routes'][entry['route'] or 'no request'] += 1
+            shape['sql'] = entry['sql']
+            if entry['explain']:
+                shape['explain'] = entry['explain']
+
+        if not shapes:
+            self.stdout.write('No slow queries logged in %s' % options['log'])
+            return
+
+        index_prefixes = get_index_prefixes()
+        ranked = sorted(shapes.items(), key=lambda item: item[1]['total'], reverse=True)
+        for rank, (fingerprint, shape) in enumerate(ranked[:options['top']], start=1):
+            self.stdout.write(self.style.MIGRATE_HEADING('%d. %.1f ms total, %d calls, %.1f ms mean, %.1f ms max' % (
+                rank, shape['total'], shape['count'], shape['total'] / shape['count'], shape['max']
+            )))
+            self.stdout.write('   routes: %s' % ', '.join(
+                '%s (%d)' % (route, count) for route, count in shape['routes'].most_common()
+            ))
+            self.stdout.write('   %s' % fingerprint)
+            for line in shape['explain'] or ():
+                self.stdout.write('   plan: %s' % line)
+            for hint in get_index_hints(shape['sql'], shape['explain'], index_prefixes):
+                self.stdout.write(self.style.WARNING('   hint: %s' % hint))
@@ -0,0 +1,190 @@
+import bisect
+import threading
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.template.backends.django import DjangoTemplates, Template
+
+
+# Statistics of the request handled by the current thread or task.
+current_request_stats = ContextVar('current_request_stats', default=None)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{%s}' % ','.join('%s="%s"' % (name, value) for name, value in zip(names, escaped))
+
+
+class Metric:
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def get_key(self, labels):
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.documentation), '# TYPE %s %s' % (self.name, self.type)]
+        with self.lock:
+            values = sorted(self.values.items())
+        for key, value in values:
+            lines.extend(self.render_value(key, value))
+        return lines
+
+
+class Counter(Metric):
+
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.get_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render_value(self, key, value):
+        yield '%s%s %s' % (self.name, format_labels(self.labelnames, key), format_value(value))
+
+
+class Histogram(Metric):
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.get_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # One slot per bucket, one for +Inf and the running sum.
+                counts = self.values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def render_value(self, key, value):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), value[:-1]):
+            cumulative += count
+            labels = format_labels(self.labelnames + ('le',), key + (bound,))
+            yield '%s_bucket%s %d' % (self.name, labels, cumulative)
+        labels = format_labels(self.labelnames, key)
+        yield '%s_sum%s %s' % (self.name, labels, format_value(value[-1]))
+        yield '%s_count%s %d' % (self.name, labels, cumulative)
+
+
+registry = []
+
+requests_total = Counter(
+    'shop_http_requests_total', 'Handled requests by route, method and status.', ('route', 'method', 'status')
+)
+request_duration = Histogram(
+    'shop_http_request_duration_seconds', 'Request latency by route.', ('route', 'method')
+)
+db_queries = Histogram(
+    'shop_db_queries_per_request', 'Database queries issued by one request.', ('route',), QUERY_COUNT_BUCKETS
+)
+db_duration = Histogram(
+    'shop_db_duration_seconds', 'Time one request spent waiting on the database.', ('route',)
+)
+template_duration = Histogram(
+    'shop_template_render_seconds', 'Render time of templates rendered by views.', ('template',)
+)
+
+
+def render_metrics():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+class RequestStats:
+    """Per request counters filled by the database and template hooks."""
+
+    def __init__(self, request):
+        self.request = request
+        self.start = perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_depth = 0
+
+    @property
+    def route(self):
+        # Resolved by the handler before the view middleware and the view run.
+        match = self.request.resolver_match
+        return match.view_name if match else None
+
+    def execute(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - start
+            self.queries += 1
+
+
+def count_query(execute, sql, params, many, context):
+    """Persistent ``execute_wrapper`` adding every query to the stats of the current request."""
+    stats = current_request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.execute(execute, sql, params, many, context)
+
+
+def get_current_route():
+    stats = current_request_stats.get()
+    return stats.route if stats else None
+
+
+def record_request(stats, method, status):
+    route = stats.route or 'unmatched'
+    requests_total.inc(route=route, method=method, status=status)
+    request_duration.observe(perf_counter() - stats.start, route=route, method=method)
+    db_queries.observe(stats.queries, route=route)
+    db_duration.observe(stats.db_time, route=route)
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        stats = current_request_stats.get()
+        if stats is None or stats.template_depth:
+            return super().render(context, request)
+
+        # Templates rendered from inside another template are part of its time.
+        stats.template_depth += 1
+        start = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_depth -= 1
+            template_duration.observe(perf_counter() - start, template=self.origin.template_name or 'string')
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """Django template backend that reports the render time of every template to the metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
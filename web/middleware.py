@@ -0,0 +1,130 @@
+import asyncio
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import RequestStats, current_request_stats, record_request
+from .queries import check_request_queries, track_queries
+from .routers import RoutingState, current_routing
+from .services import get_request_cart
+
+
+class SyncAndAsyncMiddleware:
+    """
+    Base of the middleware below, which run in the mode of the handler.
+
+    Django 3.2 runs sync-only middleware, and with them the rest of the chain,
+    in its single thread-sensitive executor, which would serialize requests to
+    async views. Subclasses put the rest of the chain inside ``wrap()``, a
+    context manager, and see the response in ``finish()``. Neither may block.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Mark the instance as a coroutine function, like Django's MiddlewareMixin does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self.wrap(request) as state:
+            response = self.get_response(request)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        with self.wrap(request) as state:
+            response = await self.get_response(request)
+        return self.finish(request, response, state)
+
+    def wrap(self, request):
+        return nullcontext()
+
+    def finish(self, request, response, state):
+        return response
+
+
+class CartMiddleware(SyncAndAsyncMiddleware):
+    """
+    Attach a lazily resolved ``request.cart``.
+
+    Requests that never touch the cart pay nothing, the others resolve it once.
+    """
+
+    def wrap(self, request):
+        request.cart = SimpleLazyObject(lambda: get_request_cart(request))
+        return nullcontext()
+
+
+class MetricsMiddleware(SyncAndAsyncMiddleware):
+    """
+    Record latency, database queries and database time of every request per
+    route. Keep it first in ``MIDDLEWARE`` so the whole stack is timed.
+    """
+
+    @contextmanager
+    def wrap(self, request):
+        stats = RequestStats(request)
+        token = current_request_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            current_request_stats.reset(token)
+
+    def finish(self, request, response, stats):
+        record_request(stats, request.method, response.status_code)
+        return response
+
+
+class QueryCheckMiddleware(SyncAndAsyncMiddleware):
+    """
+    Report N+1 query patterns and views over their query budget, meant for
+    development and staging. Enabled by ``QUERY_CHECK_ENABLED``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_CHECK_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def wrap(self, request):
+        return track_queries()
+
+    def finish(self, request, response, tracker):
+        check_request_queries(tracker, request)
+        return response
+
+
+class ReplicaPinMiddleware(SyncAndAsyncMiddleware):
+    """
+    Track writes for ``ReplicaRouter`` and pin clients that wrote something to
+    the primary database with a short lived cookie. Keep it above
+    ``SessionMiddleware`` so session writes count too.
+    """
+
+    COOKIE_NAME = 'pin_primary'
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    @contextmanager
+    def wrap(self, request):
+        state = RoutingState(pinned=self.COOKIE_NAME in request.COOKIES)
+        token = current_routing.set(state)
+        try:
+            yield state
+        finally:
+            current_routing.reset(token)
+
+    def finish(self, request, response, state):
+        if state.wrote:
+            response.set_cookie(self.COOKIE_NAME, '1', max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 3.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0008_alter_order_cart'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='headphones',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Updated at'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='notebook',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Updated at'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='smartphone',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Updated at'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='smarttv',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Updated at'),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0009_product_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cartproduct',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='web.customer', verbose_name='Customer'),
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 3.2 on 2026-10-18 10:00
+
+import re
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# Frozen copy of web.utils.parse_spec_number at the time of this migration.
+SPEC_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
+
+
+def parse_spec_number(value):
+    if not value:
+        return None
+    match = SPEC_NUMBER_RE.search(str(value))
+    if match is None:
+        return None
+    return Decimal(match.group().replace(',', '.'))
+
+
+NORMALIZED_SPECS = {
+    'notebook': {'ram_gb': 'ram', 'diagonal_inches': 'diagonal'},
+    'smartphone': {'ram_gb': 'ram', 'diagonal_inches': 'diagonal'},
+    'smarttv': {'diagonal_inches': 'diagonal'},
+}
+
+
+def normalize_specs(apps, schema_editor):
+    for model_name, specs in NORMALIZED_SPECS.items():
+        model = apps.get_model('web', model_name)
+        batch = []
+        for product in model._base_manager.only('id', *specs.values()).iterator(chunk_size=2000):
+            for field_name, source in specs.items():
+                number = parse_spec_number(getattr(product, source))
+                setattr(product, field_name, None if number is None else model._meta.get_field(field_name).to_python(number))
+            batch.append(product)
+            if len(batch) == 2000:
+                model._base_manager.bulk_update(batch, list(specs))
+                batch = []
+        if batch:
+            model._base_manager.bulk_update(batch, list(specs))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0010_alter_cartproduct_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notebook',
+            name='diagonal_inches',
+            field=models.DecimalField(blank=True, decimal_places=1, editable=False, max_digits=5, null=True, verbose_name='Screen diagonal, inches'),
+        ),
+        migrations.AddField(
+            model_name='notebook',
+            name='ram_gb',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='RAM, GB'),
+        ),
+        migrations.AddField(
+            model_name='smartphone',
+            name='diagonal_inches',
+            field=models.DecimalField(blank=True, decimal_places=1, editable=False, max_digits=5, null=True, verbose_name='Screen diagonal, inches'),
+        ),
+        migrations.AddField(
+            model_name='smartphone',
+            name='ram_gb',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='RAM, GB'),
+        ),
+        migrations.AddField(
+            model_name='smarttv',
+            name='diagonal_inches',
+            field=models.DecimalField(blank=True, decimal_places=1, editable=False, max_digits=5, null=True, verbose_name='Screen diagonal, inches'),
+        ),
+        migrations.RunPython(normalize_specs, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='headphones',
+            index=models.Index(fields=['price'], name='headphones_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='headphones',
+            index=models.Index(fields=['connection_type', 'price'], name='headphones_conn_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='headphones',
+            index=models.Index(fields=['fastening', 'price'], name='headphones_fast_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notebook',
+            index=models.Index(fields=['price'], name='notebook_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notebook',
+            index=models.Index(fields=['ram_gb', 'price'], name='notebook_ram_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notebook',
+            index=models.Index(fields=['diagonal_inches', 'price'], name='notebook_diag_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(fields=['price'], name='smartphone_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(fields=['ram_gb', 'price'], name='smartphone_ram_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(fields=['diagonal_inches', 'price'], name='smartphone_diag_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(fields=['sd', 'price'], name='smartphone_sd_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smarttv',
+            index=models.Index(fields=['price'], name='smarttv_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smarttv',
+            index=models.Index(fields=['diagonal_inches', 'price'], name='smarttv_diag_price_idx'),
+        ),
+    ]
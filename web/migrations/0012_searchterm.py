@@ -0,0 +1,95 @@
+# Generated by Django 3.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+# Frozen copy of the tokenizer and term weights of web.search at the time of this migration.
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+STOP_WORDS = frozenset(('and', 'the', 'for', 'with', 'of', 'in', 'on', 'to', 'is'))
+TITLE_WEIGHT = 10
+SPEC_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+SPEC_FIELDS = {
+    'notebook': ('diagonal', 'display_type', 'ram', 'processor_freq', 'video', 'battery', 'os'),
+    'smartphone': (
+        'diagonal', 'display_type', 'resolution', 'ram', 'sd_volume', 'battery', 'main_cam', 'frontal_cam'
+    ),
+    'smarttv': ('diagonal', 'resolution', 'built_in_apps'),
+    'headphones': ('connection_type', 'fastening', 'speaker_freq', 'battery'),
+}
+
+
+def get_product_terms(model_name, product):
+    terms = {}
+
+    def add(text, weight):
+        for token in TOKEN_RE.findall(str(text).lower()):
+            if len(token) >= MIN_TERM_LENGTH and token not in STOP_WORDS:
+                token = token[:MAX_TERM_LENGTH]
+                terms[token] = terms.get(token, 0) + weight
+
+    add(product.title, TITLE_WEIGHT)
+    for field_name in SPEC_FIELDS[model_name]:
+        value = getattr(product, field_name)
+        if value:
+            add(value, SPEC_WEIGHT)
+    add(product.description, DESCRIPTION_WEIGHT)
+    return terms
+
+
+def fill_search_terms(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    SearchTerm = apps.get_model('web', 'SearchTerm')
+    for model_name in SPEC_FIELDS:
+        model = apps.get_model('web', model_name)
+        if not model._base_manager.exists():
+            continue
+        content_type, created = ContentType.objects.get_or_create(app_label='web', model=model_name)
+        batch = []
+        for product in model._base_manager.iterator(chunk_size=2000):
+            batch.extend(
+                SearchTerm(term=term, content_type_id=content_type.id, object_id=product.id, weight=weight)
+                for term, weight in get_product_terms(model_name, product).items()
+            )
+            if len(batch) >= 2000:
+                SearchTerm.objects.bulk_create(batch)
+                batch = []
+        SearchTerm.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('web', '0011_product_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Term')),
+                ('object_id', models.PositiveIntegerField()),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Weight')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Search term',
+                'verbose_name_plural': 'Search terms',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['term', 'content_type', 'object_id', 'weight'], name='searchterm_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchterm',
+            index=models.Index(fields=['content_type', 'object_id'], name='searchterm_product_idx'),
+        ),
+        migrations.RunPython(fill_search_terms, migrations.RunPython.noop),
+    ]
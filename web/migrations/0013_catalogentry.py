@@ -0,0 +1,111 @@
+# Generated by Django 3.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Frozen copy of the spec summary of web.catalog at the time of this migration.
+SPEC_SUMMARY_FIELDS = {
+    'notebook': (
+        ('Diagonal', 'diagonal'), ('Display type', 'display_type'), ('RAM', 'ram'),
+        ('Processor frequency', 'processor_freq'), ('Video card', 'video'), ('Battery life', 'battery'),
+        ('Operating system', 'os')
+    ),
+    'smartphone': (
+        ('Diagonal', 'diagonal'), ('Display type', 'display_type'), ('Resolution', 'resolution'), ('RAM', 'ram'),
+        ('Maximal SD card volume', 'sd_volume'), ('Battery life', 'battery'), ('Main camera', 'main_cam'),
+        ('Frontal camera', 'frontal_cam')
+    ),
+    'smarttv': (
+        ('Diagonal', 'diagonal'), ('Resolution', 'resolution'), ('Built-in apps', 'built_in_apps')
+    ),
+    'headphones': (
+        ('Connection type', 'connection_type'), ('Headphones fastening', 'fastening'),
+        ('Speaker frequency', 'speaker_freq'), ('Battery life', 'battery')
+    )
+}
+SPEC_SUMMARY_LENGTH = 500
+
+
+def get_catalog_values(model_name, product):
+    spec_summary = ', '.join(
+        '%s: %s' % (name, getattr(product, field_name))
+        for name, field_name in SPEC_SUMMARY_FIELDS[model_name]
+        if getattr(product, field_name, None)
+    )
+    return dict(
+        object_id=product.id,
+        product_type=model_name,
+        category_id=product.category_id,
+        slug=product.slug,
+        title=product.title,
+        price=product.price,
+        image=product.image.name,
+        spec_summary=spec_summary[:SPEC_SUMMARY_LENGTH],
+        updated_at=product.updated_at
+    )
+
+
+def fill_catalog(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    CatalogEntry = apps.get_model('web', 'CatalogEntry')
+    for model_name in SPEC_SUMMARY_FIELDS:
+        model = apps.get_model('web', model_name)
+        if not model._base_manager.exists():
+            continue
+        content_type, created = ContentType.objects.get_or_create(app_label='web', model=model_name)
+        batch = []
+        for product in model._base_manager.iterator(chunk_size=2000):
+            batch.append(CatalogEntry(content_type_id=content_type.id, **get_catalog_values(model_name, product)))
+            if len(batch) == 2000:
+                CatalogEntry.objects.bulk_create(batch)
+                batch = []
+        CatalogEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('web', '0012_searchterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('product_type', models.CharField(max_length=100, verbose_name='Product type')),
+                ('slug', models.SlugField()),
+                ('title', models.CharField(max_length=250, verbose_name='Title')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=9, verbose_name='Price')),
+                ('image', models.ImageField(upload_to='', verbose_name='Image')),
+                ('spec_summary', models.CharField(blank=True, max_length=500, verbose_name='Specifications')),
+                ('updated_at', models.DateTimeField(verbose_name='Updated at')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='web.category', verbose_name='Category')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Catalog entry',
+                'verbose_name_plural': 'Catalog',
+            },
+        ),
+        migrations.RunPython(fill_catalog, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='catalogentry',
+            index=models.Index(fields=['product_type', 'object_id'], name='catalogentry_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogentry',
+            index=models.Index(fields=['category', 'price'], name='catalogentry_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='catalogentry',
+            index=models.Index(fields=['price'], name='catalogentry_price_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='catalogentry',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='catalogentry_product_unique'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0013_catalogentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='order_type',
+            field=models.CharField(choices=[('pickup', 'Pickup'), ('delivery', 'Delivery')], db_index=True, default='pickup', max_length=100, verbose_name="Order's delivery method"),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('new', 'New'), ('processing', 'Order is in processing'), ('ready', 'Order is ready'), ('completed', 'Order completed')], db_index=True, default='new', max_length=100, verbose_name="Order's status"),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0014_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_type', models.CharField(max_length=100, verbose_name='Product type')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Product id')),
+                ('title', models.CharField(max_length=250, verbose_name='Title')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=9, verbose_name='Unit price')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Quantity')),
+                ('final_price', models.DecimalField(decimal_places=2, max_digits=9, verbose_name='Line total')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='web.order', verbose_name='Order')),
+            ],
+            options={
+                'verbose_name': 'Order item',
+                'verbose_name_plural': 'Order items',
+            },
+        ),
+    ]
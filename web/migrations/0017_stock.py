@@ -0,0 +1,54 @@
+# Generated by Django 3.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('web', '0016_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='headphones',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Stock'),
+        ),
+        migrations.AddField(
+            model_name='notebook',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Stock'),
+        ),
+        migrations.AddField(
+            model_name='smartphone',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Stock'),
+        ),
+        migrations.AddField(
+            model_name='smarttv',
+            name='stock',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Stock'),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('quantity', models.PositiveIntegerField(verbose_name='Quantity')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expires at')),
+                ('cart', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='web.cart', verbose_name='Cart')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'Stock reservation',
+                'verbose_name_plural': 'Stock reservations',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stockreservation',
+            constraint=models.UniqueConstraint(fields=('cart', 'content_type', 'object_id'), name='reservation_cart_product_unique'),
+        ),
+    ]
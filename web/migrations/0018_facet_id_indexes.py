@@ -0,0 +1,77 @@
+# Generated by Django 3.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0017_stock'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='headphones',
+            name='headphones_conn_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='headphones',
+            name='headphones_fast_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notebook',
+            name='notebook_ram_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='notebook',
+            name='notebook_diag_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='smartphone',
+            name='smartphone_ram_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='smartphone',
+            name='smartphone_diag_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='smartphone',
+            name='smartphone_sd_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='smarttv',
+            name='smarttv_diag_price_idx',
+        ),
+        migrations.AddIndex(
+            model_name='headphones',
+            index=models.Index(fields=['connection_type', 'id'], name='headphones_conn_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='headphones',
+            index=models.Index(fields=['fastening', 'id'], name='headphones_fast_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notebook',
+            index=models.Index(fields=['ram_gb', 'id'], name='notebook_ram_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notebook',
+            index=models.Index(fields=['diagonal_inches', 'id'], name='notebook_diag_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(fields=['ram_gb', 'id'], name='smartphone_ram_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(fields=['diagonal_inches', 'id'], name='smartphone_diag_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smartphone',
+            index=models.Index(fields=['sd', 'id'], name='smartphone_sd_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smarttv',
+            index=models.Index(fields=['diagonal_inches', 'id'], name='smarttv_diag_id_idx'),
+        ),
+    ]
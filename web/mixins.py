@@ -1,49 +1,62 @@
 from .models import *
+from .facets import FacetFilter
+from .registry import product_types
+from .services import persist_cart
+from .utils import keyset_paginate
+from django.db.models.functions import Substr
+from django.http import Http404
+from django.shortcuts import get_object_or_404
 from django.views.generic.detail import SingleObjectMixin
 from django.views.generic import View
 
 
 class CategoryDetailMixin(SingleObjectMixin):
-    
-    CATEGORY_SLUG_TO_PRODUCT_MODEL = {
-        'notebooks': Notebook,
-        'smartphones': Smartphone,
-        'smarttvs': SmartTV,
-        'headphones': Headphones
-    }
+
+    CATEGORY_PRODUCTS_PER_PAGE = 12
+    CATEGORY_PRODUCT_FIELDS = ('id', 'slug', 'title', 'price', 'image')
+    SHORT_DESCRIPTION_LENGTH = 200
 
     def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['categories'] = Category.objects.get_categories_for_left_sidebar()
         
-        if isinstance(self.get_object(), Category):
-            model = self.CATEGORY_SLUG_TO_PRODUCT_MODEL[self.get_object().slug]
-            context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.get_categories_for_left_sidebar()
-            context['category_products'] = model.objects.all()
-            return context
-        else:
-            context = super().get_context_data(**kwargs)
-            context['categories'] = Category.objects.get_categories_for_left_sidebar()
-            return context
+        if isinstance(self.object, Category):
+            product_type = product_types.get_by_category_slug(self.object.slug)
+            if product_type is None:
+                raise Http404('Category %s has no products' % self.object.slug)
+            model = product_type.model
+            facet_filter = FacetFilter(model, self.request.GET)
+            products, next_cursor = keyset_paginate(
+                self.get_category_queryset(model, facet_filter), self.request.GET.get('after'), self.CATEGORY_PRODUCTS_PER_PAGE
+            )
+            filter_query = self.request.GET.copy()
+            filter_query.pop('after', None)
+            context['category_products'] = products
+            context['next_cursor'] = next_cursor
+            context['is_first_page'] = 'after' not in self.request.GET
+            context['facets'] = facet_filter.get_facets(model.objects.all())
+            context['filter_query'] = filter_query.urlencode()
+        return context
+
+    @classmethod
+    def get_category_queryset(cls, model, facet_filter):
+        return facet_filter.filter(model.objects.only(*cls.CATEGORY_PRODUCT_FIELDS)).annotate(
+            short_description=Substr('description', 1, cls.SHORT_DESCRIPTION_LENGTH + 1)
+        )
 
 
 class CartMixin(View):
 
-    def dispatch(self, request, *args, **kwargs):
-        if request.user.is_authenticated:
-            customer = Customer.objects.filter(user=request.user).first()
-            if not customer:
-                customer = Customer.objects.create(user=request.user)
-            
-            self.cart = Cart.objects.filter(owner=customer, in_order=False).first()
-            if not self.cart:
-                self.cart = Cart.objects.create(owner=customer)
-        else: 
-            self.cart = Cart.objects.filter(for_anonymous_user=True).first()
-            if not self.cart:
-                self.cart = Cart.objects.create(for_anonymous_user=True)
-
-        return super().dispatch(request, *args, **kwargs)
-
-
+    @property
+    def cart(self):
+        # Resolved lazily, at most once per request, by web.middleware.CartMiddleware.
+        return self.request.cart
 
+    def get_cart_for_update(self):
+        return persist_cart(self.request, self.cart)
 
+    def get_product(self, ct_model, slug):
+        product_type = product_types.get(ct_model)
+        if product_type is None:
+            raise Http404('Unknown product type %s' % ct_model)
+        return product_type, get_object_or_404(product_type.model, slug=slug)
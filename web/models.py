@@ -1,10 +1,14 @@
-from django.db import models
+from django.db import connections, models
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.utils import timezone 
 from django.urls import reverse 
 
+from .routers import PRIMARY
+from .utils import parse_spec_number
+
 User = get_user_model()
 
 def get_product_url(obj, viewname):
@@ -14,13 +18,9 @@ def get_product_url(obj, viewname):
 
 
 class CategoryManager(models.Manager):
-    
-    CATEGORY_NAME_COUNT_NAME = {
-        'Notebooks': 'notebook__count',
-        'Smartphones': 'smartphone__count',
-        'Smart TVs': 'smarttv__count',
-        'Headphones': 'headphones__count'
-    }
+
+    SIDEBAR_CACHE_KEY = 'web:sidebar_categories'
+    SIDEBAR_CACHE_TIMEOUT = 60 * 15
 
     def get_queryset(self):
         return super().get_queryset()
@@ -29,14 +29,27 @@ class CategoryManager(models.Manager):
         return [models.Count(model_name) for model_name in model_names]
 
     def get_categories_for_left_sidebar(self):
-        models = self.get_models_for_count('notebook', 'smartphone', 'smarttv', 'headphones')
-        qs = list(self.get_queryset().annotate(*models))
+        data = cache.get(self.SIDEBAR_CACHE_KEY)
+        if data is None:
+            data = self.count_categories_for_left_sidebar()
+            cache.set(self.SIDEBAR_CACHE_KEY, data, self.SIDEBAR_CACHE_TIMEOUT)
+        return data
+
+    def count_categories_for_left_sidebar(self):
+        # The counts are cached right after a write invalidated them, a lagging
+        # replica would put the old counts back for the whole timeout.
+        counts = dict(
+            CatalogEntry.objects.using(PRIMARY).order_by().values_list('category').annotate(models.Count('id'))
+        )
         data = [
-            dict(name=c.name, url=c.get_url(), count=getattr(c, self.CATEGORY_NAME_COUNT_NAME[c.name]))
-            for c in qs
+            dict(name=c.name, url=c.get_url(), count=counts.get(c.id, 0))
+            for c in self.get_queryset().using(PRIMARY)
         ]
         return data
 
+    def invalidate_left_sidebar(self):
+        cache.delete(self.SIDEBAR_CACHE_KEY)
+
 
 
 class Category(models.Model):
@@ -62,6 +75,9 @@ class Product(models.Model):
     MIN_RESOLUTION = (400, 400)
     MAX_RESOLUTION = (800, 800)
     MAX_FILE_SIZE = 3145728
+
+    # Numeric column -> free-text spec it is parsed from, used by the facets.
+    NORMALIZED_SPECS = {}
     
     class Meta:
         abstract = True
@@ -74,6 +90,10 @@ class Product(models.Model):
     description = models.TextField(verbose_name='Description')
     price = models.DecimalField(max_digits=9, decimal_places=2, verbose_name='Price')
     image = models.ImageField(verbose_name='Image') # , upload_to='img/'
+    # Units left for sale, reservations are already subtracted. Empty means not tracked.
+    # Set on creation, afterwards only changed by the F() updates of web.stock.
+    stock = models.PositiveIntegerField(verbose_name='Stock', null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated at')
 
     def __str__(self):
         return self.title
@@ -84,6 +104,24 @@ class Product(models.Model):
     def get_model_name(self):
         return self.__class__.__name__.lower()
 
+    def normalize_specs(self):
+        for field_name, source in self.NORMALIZED_SPECS.items():
+            number = parse_spec_number(getattr(self, source))
+            setattr(self, field_name, None if number is None else self._meta.get_field(field_name).to_python(number))
+
+    def save(self, *args, **kwargs):
+        self.normalize_specs()
+        if not self._state.adding and not kwargs.get('force_insert'):
+            # Carts move the stock concurrently, an update written from a stale
+            # instance or an admin form would overwrite their reservations.
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = {
+                    field.attname for field in self._meta.concrete_fields if not field.primary_key
+                } - self.get_deferred_fields()
+            kwargs['update_fields'] = [name for name in update_fields if name != 'stock']
+        return super().save(*args, **kwargs)
+
 
 
 class Notebook(Product):
@@ -91,6 +129,14 @@ class Notebook(Product):
     class Meta:
         verbose_name = 'Notebook'
         verbose_name_plural = 'Notebooks'
+        indexes = [
+            models.Index(fields=['price'], name='notebook_price_idx'),
+            models.Index(fields=['ram_gb', 'id'], name='notebook_ram_id_idx'),
+            models.Index(fields=['diagonal_inches', 'id'], name='notebook_diag_id_idx')
+        ]
+
+    CATEGORY_SLUG = 'notebooks'
+    NORMALIZED_SPECS = {'ram_gb': 'ram', 'diagonal_inches': 'diagonal'}
 
     display_type = models.CharField(max_length=250, verbose_name='Display type')
     processor_freq = models.CharField(max_length=250, verbose_name='Processor frequency')
@@ -102,6 +148,9 @@ class Notebook(Product):
     
     battery = models.CharField(max_length=250, verbose_name= 'Battery life')
 
+    ram_gb = models.PositiveSmallIntegerField(verbose_name='RAM, GB', null=True, blank=True, editable=False)
+    diagonal_inches = models.DecimalField(max_digits=5, decimal_places=1, verbose_name='Screen diagonal, inches', null=True, blank=True, editable=False)
+
 
 
 class Smartphone(Product):
@@ -109,6 +158,15 @@ class Smartphone(Product):
     class Meta:
         verbose_name = 'Smartphone'
         verbose_name_plural = 'Smartphones'
+        indexes = [
+            models.Index(fields=['price'], name='smartphone_price_idx'),
+            models.Index(fields=['ram_gb', 'id'], name='smartphone_ram_id_idx'),
+            models.Index(fields=['diagonal_inches', 'id'], name='smartphone_diag_id_idx'),
+            models.Index(fields=['sd', 'id'], name='smartphone_sd_id_idx')
+        ]
+
+    CATEGORY_SLUG = 'smartphones'
+    NORMALIZED_SPECS = {'ram_gb': 'ram', 'diagonal_inches': 'diagonal'}
 
     diagonal = models.CharField(max_length=250, verbose_name='Screen diagonal')
     display_type = models.CharField(max_length=250, verbose_name='Display type')
@@ -123,6 +181,9 @@ class Smartphone(Product):
     main_cam = models.CharField(max_length=250, verbose_name='Main camera')
     frontal_cam = models.CharField(max_length=250, verbose_name='Frontal camera')
 
+    ram_gb = models.PositiveSmallIntegerField(verbose_name='RAM, GB', null=True, blank=True, editable=False)
+    diagonal_inches = models.DecimalField(max_digits=5, decimal_places=1, verbose_name='Screen diagonal, inches', null=True, blank=True, editable=False)
+
 
 
 class SmartTV(Product):
@@ -130,6 +191,13 @@ class SmartTV(Product):
     class Meta:
         verbose_name = 'Smart TV'
         verbose_name_plural = 'Smart TVs'
+        indexes = [
+            models.Index(fields=['price'], name='smarttv_price_idx'),
+            models.Index(fields=['diagonal_inches', 'id'], name='smarttv_diag_id_idx')
+        ]
+
+    CATEGORY_SLUG = 'smarttvs'
+    NORMALIZED_SPECS = {'diagonal_inches': 'diagonal'}
 
     diagonal = models.CharField(max_length=250, verbose_name='Screen diagonal')
     resolution = models.CharField(max_length=250, verbose_name='Screen resolution')
@@ -137,6 +205,8 @@ class SmartTV(Product):
     built_in_browser = models.BooleanField(default=False, verbose_name='Built-in browser')
     built_in_apps = models.CharField(max_length=250, verbose_name='Built-in apps', null=True, blank=True)
 
+    diagonal_inches = models.DecimalField(max_digits=5, decimal_places=1, verbose_name='Screen diagonal, inches', null=True, blank=True, editable=False)
+
 
 
 class Headphones(Product):
@@ -144,6 +214,13 @@ class Headphones(Product):
     class Meta:
         verbose_name = 'Headphones'
         verbose_name_plural = 'Headphones'
+        indexes = [
+            models.Index(fields=['price'], name='headphones_price_idx'),
+            models.Index(fields=['connection_type', 'id'], name='headphones_conn_id_idx'),
+            models.Index(fields=['fastening', 'id'], name='headphones_fast_id_idx')
+        ]
+
+    CATEGORY_SLUG = 'headphones'
 
     CONNECTION_TYPE_WIRE = 'wire'
     CONNECTION_TYPE_WIRELESS = 'wireless'
@@ -195,7 +272,7 @@ class CartProduct(models.Model):
         verbose_name = 'Product in cart'
         verbose_name_plural = 'Products in cart'
 
-    user = models.ForeignKey('Customer', verbose_name='Customer', on_delete=models.CASCADE)
+    user = models.ForeignKey('Customer', verbose_name='Customer', on_delete=models.CASCADE, null=True, blank=True)
     cart = models.ForeignKey('Cart', verbose_name='Cart', on_delete=models.CASCADE)
 
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
@@ -207,7 +284,7 @@ class CartProduct(models.Model):
     final_price = models.DecimalField(max_digits=9, decimal_places=2, verbose_name='Final price', default=0)
 
     def __str__(self):
-        return 'Product %s from cart #%d' % (self.content_object.title, self.cart.id)
+        return 'Product %s from cart #%d' % (self.content_object.title, self.cart_id)
 
     def save(self, *args, **kwargs):
         self.final_price = self.quantity * self.content_object.price
@@ -215,6 +292,33 @@ class CartProduct(models.Model):
 
 
 
+class StockReservation(models.Model):
+    """
+    Units of a product held for a cart line. The product stock is decremented
+    when the reservation is made and given back when it is released or expires.
+    """
+
+    class Meta:
+        verbose_name = 'Stock reservation'
+        verbose_name_plural = 'Stock reservations'
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'content_type', 'object_id'], name='reservation_cart_product_unique')
+        ]
+
+    # Deleted carts leave their reservations to expire, so the stock is never lost.
+    cart = models.ForeignKey('Cart', verbose_name='Cart', on_delete=models.SET_NULL, null=True, blank=True)
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+
+    quantity = models.PositiveIntegerField(verbose_name='Quantity')
+    expires_at = models.DateTimeField(verbose_name='Expires at', db_index=True)
+
+    def __str__(self):
+        return '%d units of %s for cart #%s' % (self.quantity, self.content_object, self.cart_id)
+
+
+
 class Customer(models.Model):
 
     class Meta:
@@ -266,8 +370,8 @@ class Order(models.Model):
     phone = models.CharField(max_length=20, verbose_name='Phone number')
     address = models.CharField(max_length=1024, verbose_name='Address', null=True, blank=True)
     
-    status = models.CharField(max_length=100, verbose_name='Order\'s status', choices=STATUS_CHOICES, default=STATUS_DEFAULT)
-    order_type = models.CharField(max_length=100, verbose_name='Order\'s delivery method', choices=TYPE_CHOICES, default=TYPE_PICKUP)
+    status = models.CharField(max_length=100, verbose_name='Order\'s status', choices=STATUS_CHOICES, default=STATUS_DEFAULT, db_index=True)
+    order_type = models.CharField(max_length=100, verbose_name='Order\'s delivery method', choices=TYPE_CHOICES, default=TYPE_PICKUP, db_index=True)
 
     order_comment = models.TextField(max_length=1000, verbose_name='Order comment', null=True, blank=True)
     
@@ -279,34 +383,178 @@ class Order(models.Model):
 
 
 
+class OrderItem(models.Model):
+    """
+    Snapshot of one cart line taken at checkout, so orders never depend on the
+    cart or on the current state of the product.
+    """
+
+    class Meta:
+        verbose_name = 'Order item'
+        verbose_name_plural = 'Order items'
+
+    order = models.ForeignKey(Order, verbose_name='Order', related_name='items', on_delete=models.CASCADE)
+    product_type = models.CharField(max_length=100, verbose_name='Product type')
+    object_id = models.PositiveIntegerField(verbose_name='Product id')
+
+    title = models.CharField(max_length=250, verbose_name='Title')
+    unit_price = models.DecimalField(max_digits=9, decimal_places=2, verbose_name='Unit price')
+    quantity = models.PositiveIntegerField(verbose_name='Quantity')
+    final_price = models.DecimalField(max_digits=9, decimal_places=2, verbose_name='Line total')
+
+    def __str__(self):
+        return '%s x%d from order #%d' % (self.title, self.quantity, self.order_id)
+
+
+
+class CatalogEntry(models.Model):
+    """
+    One denormalized row per product of any type, kept in sync by signals so
+    cross-type listings can run a single indexed query.
+    """
+
+    class Meta:
+        verbose_name = 'Catalog entry'
+        verbose_name_plural = 'Catalog'
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'], name='catalogentry_product_unique')
+        ]
+        indexes = [
+            models.Index(fields=['product_type', 'object_id'], name='catalogentry_type_idx'),
+            models.Index(fields=['category', 'price'], name='catalogentry_category_idx'),
+            models.Index(fields=['price'], name='catalogentry_price_idx')
+        ]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    product_type = models.CharField(max_length=100, verbose_name='Product type')
+
+    category = models.ForeignKey(Category, verbose_name='Category', on_delete=models.CASCADE)
+    slug = models.SlugField()
+    title = models.CharField(max_length=250, verbose_name='Title')
+    price = models.DecimalField(max_digits=9, decimal_places=2, verbose_name='Price')
+    image = models.ImageField(verbose_name='Image')
+    spec_summary = models.CharField(max_length=500, verbose_name='Specifications', blank=True)
+    updated_at = models.DateTimeField(verbose_name='Updated at')
+
+    def __str__(self):
+        return self.title
+
+    def get_url(self):
+        return reverse('product_detail', kwargs={'ct_model': self.product_type, 'slug': self.slug})
+
+    def get_model_name(self):
+        return self.product_type
+
+
+
+class SearchTerm(models.Model):
+
+    class Meta:
+        verbose_name = 'Search term'
+        verbose_name_plural = 'Search terms'
+        indexes = [
+            models.Index(fields=['term', 'content_type', 'object_id', 'weight'], name='searchterm_term_idx'),
+            models.Index(fields=['content_type', 'object_id'], name='searchterm_product_idx')
+        ]
+
+    term = models.CharField(max_length=64, verbose_name='Term')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    weight = models.PositiveIntegerField(default=1, verbose_name='Weight')
+
+    def __str__(self):
+        return self.term
+
+
+
+class Task(models.Model):
+    """Unit of background work, run by the ``run_tasks`` command."""
+
+    class Meta:
+        verbose_name = 'Task'
+        verbose_name_plural = 'Tasks'
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_queue_idx')
+        ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed')
+    )
+
+    name = models.CharField(max_length=255, verbose_name='Task name')
+    payload = models.JSONField(default=dict, verbose_name='Payload')
+    idempotency_key = models.CharField(max_length=255, verbose_name='Idempotency key', unique=True, null=True, blank=True)
+
+    status = models.CharField(max_length=20, verbose_name='Status', choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name='Max attempts')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Run after')
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name='Locked until')
+    last_error = models.TextField(blank=True, verbose_name='Last error')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created at')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated at')
+
+    def __str__(self):
+        return '%s #%d' % (self.name, self.id)
+
+
+
 class LatestProductManager:
 
-    @staticmethod
-    def get_products_for_main_page(*args, **kwargs):
-        with_respect_to = kwargs.get('with_respect_to')
-        count = kwargs.get('count') # <--- updated here
-        if count:           # <--- updated here
-            count = [*count]        # <--- updated here
-        else:                       # <--- updated here
-            count = []              # <--- updated here
+    FEED_CACHE_TIMEOUT = 30
 
-        products = list()
+    def get_products_for_main_page(self, *args, **kwargs):
+        with_respect_to = kwargs.get('with_respect_to')
+        count = [*(kwargs.get('count') or [])]
+        count.extend([1 for i in range(len(args) - len(count))])
 
-        ct_models = ContentType.objects.filter(model__in=args)
-        count.extend([1 for i in range(len(ct_models) - len(count))]) # <--- updated here
+        cache_key = 'web:main_page_products:%s:%s' % (','.join(args), ','.join(map(str, count)))
+        products = cache.get(cache_key)
+        if products is None:
+            products = self.get_latest_products(dict(zip(args, count)))
+            cache.set(cache_key, products, self.FEED_CACHE_TIMEOUT)
 
-        for i, ct_model in enumerate(ct_models): # <--- updated here
-            model_products = ct_model.model_class()._base_manager.all().order_by('-id')[:count[i]] # <--- updated here
-            products.extend(model_products)
-        
         if with_respect_to and with_respect_to in args:
-            ct_models = ContentType.objects.filter(model=with_respect_to)
-            if ct_models.exists():
-                products = sorted(
-                    products,
-                    key=lambda x: x.__class__._meta.model_name.startswith(with_respect_to), reverse=True
-                )
+            products = sorted(
+                products,
+                key=lambda x: x.product_type.startswith(with_respect_to), reverse=True
+            )
+
+        return products
+
+    def get_latest_products(self, model_counts):
+        """
+        Fetch the latest catalog entries of every requested product type in one
+        UNION query over the catalog table.
+        """
+        # Read from the primary like the sidebar, the feed is cached as well.
+        querysets = [
+            CatalogEntry.objects.using(PRIMARY).filter(product_type=model_name).order_by('-object_id')[:count]
+            for model_name, count in model_counts.items()
+        ]
+        if not querysets:
+            return []
+
+        if len(querysets) > 1 and not connections[querysets[0].db].features.supports_slicing_ordering_in_compound:
+            products = [product for qs in querysets for product in qs]
+        else:
+            feed = querysets[0].union(*querysets[1:], all=True) if len(querysets) > 1 else querysets[0]
+            products = list(feed)
 
+        positions = {model_name: i for i, model_name in enumerate(model_counts)}
+        products.sort(key=lambda x: (positions[x.product_type], -x.object_id))
         return products
 
 
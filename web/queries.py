@@ -0,0 +1,151 @@
+import logging
+import os
+import re
+import sys
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Trackers of the enclosing track_queries() blocks, outermost first.
+current_query_trackers = ContextVar('current_query_trackers', default=())
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+VALUES_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+REPEATED_LIST_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+WHITESPACE_RE = re.compile(r'\s+')
+
+TEMPLATE_RENDER_FILE = os.path.join('django', 'template', 'base.py')
+STACK_DEPTH = 5
+# Modules of this app that only wrap the code being inspected.
+INSTRUMENTATION_FILES = frozenset(
+    os.path.join(os.path.dirname(__file__), name) for name in ('metrics.py', 'middleware.py', 'queries.py', 'slowqueries.py')
+)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block of code ran more queries, or more queries of one shape, than allowed."""
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """
+    Reduce a query to its shape: literals and placeholders become ``?`` and
+    lists of them ``(...)``, so the queries of an N+1 loop share one fingerprint.
+    """
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = sql.replace('%s', '?')
+    sql = VALUES_LIST_RE.sub('(...)', sql)
+    sql = REPEATED_LIST_RE.sub('(...)', sql)
+    return WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def get_origin():
+    """Describe the template line and the project code that issued the current query."""
+    template = None
+    frame = sys._getframe(1)
+    while frame is not None and template is None:
+        code = frame.f_code
+        if code.co_name == 'render_annotated' and code.co_filename.endswith(TEMPLATE_RENDER_FILE):
+            node = frame.f_locals.get('self')
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                template = '%s, line %d' % (origin.template_name or origin.name, token.lineno)
+        frame = frame.f_back
+
+    base_dir = str(settings.BASE_DIR)
+    stack = [
+        '%s:%d in %s' % (os.path.relpath(entry.filename, base_dir), entry.lineno, entry.name)
+        for entry in traceback.extract_stack()[:-1]
+        if entry.filename.startswith(base_dir)
+        and entry.filename not in INSTRUMENTATION_FILES
+        and 'site-packages' not in entry.filename
+    ]
+    lines = ['template %s' % template] if template else []
+    lines.extend(reversed(stack[-STACK_DEPTH:]))
+    return lines
+
+
+class QueryTracker:
+    """
+    Count the queries of a block by fingerprint and remember where a shape
+    came from once it crosses ``threshold``.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.counts = Counter()
+        self.origins = {}
+        self.total = 0
+
+    def record(self, sql):
+        shape = fingerprint(sql)
+        self.counts[shape] += 1
+        self.total += 1
+        if self.counts[shape] == self.threshold + 1:
+            self.origins[shape] = get_origin()
+
+    def get_problems(self, max_queries=None):
+        problems = []
+        if max_queries is not None and self.total > max_queries:
+            problems.append('%d queries, the budget is %d' % (self.total, max_queries))
+        for shape, count in self.counts.most_common():
+            if count <= self.threshold:
+                break
+            problems.append('\n    '.join(
+                ['Query repeated %d times: %s' % (count, shape)] + ['at %s' % line for line in self.origins[shape]]
+            ))
+        return problems
+
+
+def track_query(execute, sql, params, many, context):
+    """Persistent ``execute_wrapper`` feeding every query to the trackers of the current context."""
+    for tracker in current_query_trackers.get():
+        tracker.record(sql)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def track_queries(threshold=None):
+    tracker = QueryTracker(settings.QUERY_REPEAT_THRESHOLD if threshold is None else threshold)
+    token = current_query_trackers.set(current_query_trackers.get() + (tracker,))
+    try:
+        yield tracker
+    finally:
+        current_query_trackers.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries=None, threshold=None):
+    """
+    Fail with QueryBudgetExceeded if the block runs more than ``max_queries``
+    queries or repeats one query shape more than ``threshold`` times::
+
+        with query_budget(6):
+            self.client.get('/')
+    """
+    with track_queries(threshold) as tracker:
+        yield tracker
+    problems = tracker.get_problems(max_queries)
+    if problems:
+        raise QueryBudgetExceeded('\n'.join(problems))
+
+
+def check_request_queries(tracker, request):
+    route = request.resolver_match.view_name if request.resolver_match else None
+    problems = tracker.get_problems(settings.QUERY_BUDGETS.get(route))
+    if not problems:
+        return
+    message = 'Query problems in %s %s (%s):\n%s' % (request.method, request.path, route, '\n'.join(problems))
+    if settings.QUERY_CHECK_RAISE:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
@@ -0,0 +1,131 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, models, transaction
+from django.utils import timezone
+
+from .models import Task
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the first retry, doubled on every further failed attempt.
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 60 * 60
+# A running task whose worker died is handed out again after this many seconds.
+LOCK_TIMEOUT = 5 * 60
+
+registry = {}
+
+
+class TaskLost(Exception):
+    """The lock of a running task expired and another worker claimed it."""
+
+
+def task(name=None, max_attempts=5):
+    """Register a function as a task, it is called with the payload as keyword arguments."""
+    def decorator(func):
+        func.task_name = name or '%s.%s' % (func.__module__, func.__name__)
+        func.max_attempts = max_attempts
+        registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def enqueue(handler, payload=None, idempotency_key=None, delay=0):
+    """
+    Queue ``handler(**payload)`` and return the task.
+
+    The row is written in the current transaction, so the task exists only if
+    the surrounding work commits and workers never pick it up earlier. A task
+    with the same ``idempotency_key`` is queued only once.
+    """
+    name = handler if isinstance(handler, str) else handler.task_name
+    if name not in registry:
+        raise ValueError('Unknown task %s' % name)
+
+    values = dict(
+        name=name,
+        payload=payload or {},
+        max_attempts=registry[name].max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay)
+    )
+    if idempotency_key is None:
+        return Task.objects.create(**values)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(idempotency_key=idempotency_key, **values)
+    except IntegrityError:
+        return Task.objects.get(idempotency_key=idempotency_key)
+
+
+def get_claimable_q(now):
+    return (
+        models.Q(status=Task.STATUS_PENDING, run_after__lte=now)
+        | models.Q(status=Task.STATUS_RUNNING, locked_until__lt=now)
+    )
+
+
+def claim_tasks(limit=10):
+    """
+    Mark up to ``limit`` due tasks as running for this worker and return them.
+
+    Candidates are locked with SKIP LOCKED where the backend supports it, so
+    concurrent workers do not queue behind each other. Each row is then claimed
+    with a conditional UPDATE, which keeps two workers from running the same
+    task on backends without row locks too.
+    """
+    now = timezone.now()
+    claimable = get_claimable_q(now)
+    claimed = []
+    with transaction.atomic():
+        candidates = Task.objects.filter(claimable).order_by('run_after')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        for task_id in candidates.values_list('id', flat=True)[:limit]:
+            updated = Task.objects.filter(claimable, pk=task_id).update(
+                status=Task.STATUS_RUNNING,
+                attempts=models.F('attempts') + 1,
+                locked_until=now + timedelta(seconds=LOCK_TIMEOUT),
+                updated_at=now
+            )
+            if updated:
+                claimed.append(task_id)
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_after'))
+
+
+def run_task(task):
+    """
+    Run a claimed task, return True on success.
+
+    The handler and the ``done`` mark share one transaction, so database work of
+    a task is committed exactly once. Failed tasks are retried with exponential
+    backoff until ``max_attempts`` is reached.
+    """
+    handler = registry.get(task.name)
+    try:
+        if handler is None:
+            raise LookupError('Unknown task %s' % task.name)
+        with transaction.atomic():
+            handler(**task.payload)
+            updated = Task.objects.filter(pk=task.pk, status=Task.STATUS_RUNNING, attempts=task.attempts).update(
+                status=Task.STATUS_DONE, locked_until=None, last_error='', updated_at=timezone.now()
+            )
+            if not updated:
+                raise TaskLost('Task #%d was claimed by another worker' % task.pk)
+    except TaskLost:
+        logger.warning('Task #%d lost its lock, leaving it to the other worker', task.pk)
+        return False
+    except Exception:
+        now = timezone.now()
+        values = dict(status=Task.STATUS_PENDING, locked_until=None, last_error=traceback.format_exc(), updated_at=now)
+        if task.attempts >= task.max_attempts:
+            values['status'] = Task.STATUS_FAILED
+            logger.exception('Task %s #%d failed after %d attempts', task.name, task.pk, task.attempts)
+        else:
+            delay = min(RETRY_DELAY * 2 ** (task.attempts - 1), MAX_RETRY_DELAY)
+            values['run_after'] = now + timedelta(seconds=delay)
+        Task.objects.filter(pk=task.pk, status=Task.STATUS_RUNNING, attempts=task.attempts).update(**values)
+        return False
+    return True
@@ -0,0 +1,60 @@
+from django.contrib.contenttypes.models import ContentType
+
+
+class ProductType:
+
+    def __init__(self, model):
+        self.model = model
+        self.model_name = model._meta.model_name
+        self.category_slug = model.CATEGORY_SLUG
+
+    def __repr__(self):
+        return '<ProductType %s>' % self.model_name
+
+    @property
+    def content_type(self):
+        # ContentTypeManager keeps its own per-process cache, so only the very
+        # first lookup of every model hits the database.
+        return ContentType.objects.get_for_model(self.model)
+
+    @property
+    def content_type_id(self):
+        return self.content_type.id
+
+
+class ProductTypeRegistry:
+    """
+    URL model name / category slug -> product model lookups, filled once from
+    ``WebConfig.ready()`` so views never query ContentType to find a model.
+    """
+
+    def __init__(self):
+        self.by_model_name = {}
+        self.by_category_slug = {}
+
+    def populate(self, models):
+        for model in models:
+            product_type = ProductType(model)
+            self.by_model_name[product_type.model_name] = product_type
+            self.by_category_slug[product_type.category_slug] = product_type
+
+    def __iter__(self):
+        return iter(self.by_model_name.values())
+
+    def get(self, model_name):
+        return self.by_model_name.get(model_name)
+
+    def get_by_category_slug(self, slug):
+        return self.by_category_slug.get(slug)
+
+    def get_for_model(self, model):
+        return self.by_model_name.get(model._meta.model_name)
+
+    def model_names(self):
+        return list(self.by_model_name)
+
+    def models(self):
+        return [product_type.model for product_type in self]
+
+
+product_types = ProductTypeRegistry()
@@ -0,0 +1,68 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from .registry import product_types
+
+
+PRIMARY = 'default'
+
+# Catalog models besides the product models, they are read from replicas.
+CATALOG_MODEL_NAMES = frozenset(('category', 'catalogentry', 'searchterm'))
+
+# Routing state of the current request, None outside of requests.
+current_routing = ContextVar('current_routing', default=None)
+
+
+class RoutingState:
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def is_catalog_model(model):
+    opts = model._meta
+    return opts.app_label == 'web' and (
+        opts.model_name in CATALOG_MODEL_NAMES or product_types.get(opts.model_name) is not None
+    )
+
+
+class ReplicaRouter:
+    """
+    Send catalog reads made by requests to a random replica from
+    ``DATABASE_REPLICAS``, everything else goes to the primary.
+
+    A request reads from the primary as soon as it writes or opens a
+    transaction, and ``ReplicaPinMiddleware`` keeps the client on the primary
+    for ``REPLICA_PIN_SECONDS`` after that, so users always see their own
+    writes. Management commands and tasks always use the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_routing.get()
+        if state is None or state.pinned or not settings.DATABASE_REPLICAS or not is_catalog_model(model):
+            return PRIMARY
+        if connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,117 @@
+import re
+
+from django.db import models, transaction
+
+from .models import CatalogEntry, SearchTerm
+from .registry import product_types
+from .templatetags.specifications import PRODUCT_SPEC
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+
+STOP_WORDS = frozenset(('and', 'the', 'for', 'with', 'of', 'in', 'on', 'to', 'is'))
+
+TITLE_WEIGHT = 10
+SPEC_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TERM_LENGTH]
+        for token in TOKEN_RE.findall(str(text).lower())
+        if len(token) >= MIN_TERM_LENGTH and token not in STOP_WORDS
+    ]
+
+
+def get_product_terms(product):
+    """Return {term: weight} for the title, spec values and description of a product."""
+    terms = {}
+
+    def add(text, weight):
+        for token in tokenize(text):
+            terms[token] = terms.get(token, 0) + weight
+
+    add(product.title, TITLE_WEIGHT)
+    for field_name in PRODUCT_SPEC.get(product._meta.model_name, {}).values():
+        value = getattr(product, field_name)
+        if value:
+            add(value, SPEC_WEIGHT)
+    add(product.description, DESCRIPTION_WEIGHT)
+    return terms
+
+
+def build_search_terms(product, content_type_id):
+    return [
+        SearchTerm(term=term, content_type_id=content_type_id, object_id=product.id, weight=weight)
+        for term, weight in get_product_terms(product).items()
+    ]
+
+
+def index_product(product):
+    content_type_id = product_types.get_for_model(product).content_type_id
+    with transaction.atomic():
+        SearchTerm.objects.filter(content_type_id=content_type_id, object_id=product.id).delete()
+        SearchTerm.objects.bulk_create(build_search_terms(product, content_type_id))
+
+
+def unindex_product(product):
+    content_type_id = product_types.get_for_model(product).content_type_id
+    SearchTerm.objects.filter(content_type_id=content_type_id, object_id=product.id).delete()
+
+
+def search_products(query, page=1, per_page=12):
+    """
+    Return ``(products, has_next)`` for one page of products matching every
+    word of ``query``.
+
+    The last word also matches as a prefix, so results show up while typing.
+    Products are ranked by the summed weight of their matching terms.
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not tokens:
+        return [], False
+
+    conditions = [models.Q(term=token) for token in tokens[:-1]]
+    conditions.append(models.Q(term__startswith=tokens[-1]))
+    matches = models.Q()
+    for condition in conditions:
+        matches |= condition
+
+    offset = (page - 1) * per_page
+    rows = list(
+        SearchTerm.objects.filter(matches)
+        .values('content_type_id', 'object_id')
+        .annotate(
+            score=models.Sum('weight'),
+            **{
+                'matched_%d' % i: models.Max(models.Case(
+                    models.When(condition, then=1), default=0, output_field=models.IntegerField()
+                ))
+                for i, condition in enumerate(conditions)
+            }
+        )
+        .filter(**{'matched_%d' % i: 1 for i in range(len(conditions))})
+        .order_by('-score', 'content_type_id', 'object_id')
+        .values_list('content_type_id', 'object_id')[offset:offset + per_page + 1]
+    )
+    has_next = len(rows) > per_page
+    return load_products(rows[:per_page]), has_next
+
+
+def load_products(rows):
+    """Fetch the catalog entries of ``(content_type_id, object_id)`` rows in one query, keeping their order."""
+    if not rows:
+        return []
+    condition = models.Q()
+    for content_type_id, object_id in rows:
+        condition |= models.Q(content_type_id=content_type_id, object_id=object_id)
+    entries = {
+        (entry.content_type_id, entry.object_id): entry
+        for entry in CatalogEntry.objects.filter(condition)
+    }
+    return [entries[row] for row in rows if row in entries]
@@ -0,0 +1,264 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from .models import Cart, CartProduct, Customer, OrderItem
+from .queue import enqueue
+from .stock import claim_cart_stock, move_reservations, release_stock, reserve_stock
+from .tasks import send_order_confirmation
+from .utils import get_cart_products, recalc_cart_fin_price
+
+
+SESSION_CART_KEY = 'cart_id'
+CART_IDS_CACHE_KEY = 'web:cart_ids:%s'
+CART_IDS_CACHE_TIMEOUT = 60 * 60
+
+
+def get_customer(user):
+    customer = Customer.objects.filter(user=user).first()
+    if not customer:
+        customer = Customer.objects.create(user=user)
+    return customer
+
+
+def get_session_cart(request):
+    """
+    Return the anonymous cart remembered in the session.
+
+    Visitors who never added anything get an unsaved cart, so browsing does not
+    create rows; ``persist_cart`` writes it on the first mutation.
+    """
+    cart_id = request.session.get(SESSION_CART_KEY)
+    cart = None
+    if cart_id:
+        cart = Cart.objects.filter(pk=cart_id, for_anonymous_user=True, in_order=False).first()
+    return cart or Cart(for_anonymous_user=True)
+
+
+def get_customer_cart(user):
+    """
+    Return the open cart of ``user`` without creating any rows.
+
+    The (customer id, cart id) pair is cached per user, so a warm lookup is a
+    single primary key query. Stale ids simply fall through to the full lookup.
+    """
+    cache_key = CART_IDS_CACHE_KEY % user.pk
+    ids = cache.get(cache_key)
+    if ids:
+        customer_id, cart_id = ids
+        cart = Cart.objects.filter(pk=cart_id, owner_id=customer_id, in_order=False).first()
+        if cart:
+            return cart
+
+    customer = Customer.objects.filter(user=user).first()
+    cart = None
+    if customer:
+        cart = Cart.objects.filter(owner=customer, in_order=False).first()
+    if not cart:
+        return Cart(owner=customer)
+    cache.set(cache_key, (customer.pk, cart.pk), CART_IDS_CACHE_TIMEOUT)
+    return cart
+
+
+def get_request_cart(request):
+    if request.user.is_authenticated:
+        return get_customer_cart(request.user)
+    return get_session_cart(request)
+
+
+def persist_cart(request, cart):
+    if cart.pk is None:
+        if cart.for_anonymous_user:
+            cart.save()
+            request.session[SESSION_CART_KEY] = cart.pk
+        else:
+            if cart.owner_id is None:
+                cart.owner = get_customer(request.user)
+            cart.save()
+            cache.set(CART_IDS_CACHE_KEY % request.user.pk, (cart.owner_id, cart.pk), CART_IDS_CACHE_TIMEOUT)
+    return cart
+
+
+@transaction.atomic
+def merge_session_cart(request, user):
+    """Move the products of the session cart into the cart of ``user``."""
+    cart_id = request.session.pop(SESSION_CART_KEY, None)
+    if not cart_id:
+        return
+    anonymous_cart = Cart.objects.select_for_update().filter(
+        pk=cart_id, for_anonymous_user=True, in_order=False
+    ).first()
+    if anonymous_cart is None:
+        return
+
+    customer = get_customer(user)
+    cart = Cart.objects.select_for_update().filter(owner=customer, in_order=False).first()
+    if not cart:
+        cart = Cart.objects.create(owner=customer)
+
+    existing = {
+        (content_type_id, object_id): pk
+        for pk, content_type_id, object_id in cart.products.values_list('pk', 'content_type_id', 'object_id')
+    }
+    moved = []
+    for cart_product in anonymous_cart.products.only('content_type_id', 'object_id', 'quantity', 'final_price'):
+        pk = existing.get((cart_product.content_type_id, cart_product.object_id))
+        if pk is None:
+            moved.append(cart_product.pk)
+        else:
+            CartProduct.objects.filter(pk=pk).update(
+                quantity=F('quantity') + cart_product.quantity,
+                final_price=F('final_price') + cart_product.final_price
+            )
+
+    if moved:
+        CartProduct.objects.filter(pk__in=moved).update(cart=cart, user=customer)
+        cart.products.add(*moved)
+    move_reservations(anonymous_cart, cart)
+    anonymous_cart.delete()
+    recalc_cart_fin_price(cart)
+
+
+def lock_cart(cart):
+    """
+    Take the row lock of ``cart`` for the rest of the transaction.
+
+    Every cart mutation locks the cart row first, so concurrent requests on the
+    same cart are serialized and always acquire locks in the same order.
+    """
+    return Cart.objects.select_for_update().only('total_products', 'final_price').get(pk=cart.pk)
+
+
+def apply_cart_delta(cart, locked_cart, quantity, price):
+    Cart.objects.filter(pk=cart.pk).update(
+        total_products=F('total_products') + quantity,
+        final_price=F('final_price') + price
+    )
+    cart.total_products = locked_cart.total_products + quantity
+    cart.final_price = locked_cart.final_price + price
+
+
+def get_cart_product_for_update(cart, product_type, product):
+    return CartProduct.objects.select_for_update().filter(
+        cart=cart, content_type_id=product_type.content_type_id, object_id=product.id
+    ).only('quantity', 'final_price').first()
+
+
+@transaction.atomic
+def add_product_to_cart(cart, product_type, product, quantity=1):
+    """
+    Add ``quantity`` items of ``product`` to ``cart``, return True if a new row
+    was created. Raise OutOfStock if not enough units are left.
+    """
+    locked_cart = lock_cart(cart)
+    price = product.price * quantity
+
+    updated = CartProduct.objects.filter(
+        cart=cart, content_type_id=product_type.content_type_id, object_id=product.id
+    ).update(quantity=F('quantity') + quantity, final_price=F('final_price') + price)
+
+    if not updated:
+        cart_product = CartProduct(user=cart.owner, cart=cart, content_object=product, quantity=quantity)
+        cart_product.save()
+        cart.products.add(cart_product)
+
+    reserve_stock(cart, product_type, product, quantity)
+    apply_cart_delta(cart, locked_cart, quantity, price)
+    return not updated
+
+
+@transaction.atomic
+def change_cart_product_quantity(cart, product_type, product, quantity):
+    """
+    Set the quantity of ``product`` in ``cart``, return False if it is not in
+    the cart. Raise OutOfStock if not enough units are left.
+    """
+    if quantity < 1:
+        return remove_product_from_cart(cart, product_type, product)
+    if cart.pk is None:
+        return False
+
+    locked_cart = lock_cart(cart)
+    cart_product = get_cart_product_for_update(cart, product_type, product)
+    if cart_product is None:
+        return False
+
+    if quantity > cart_product.quantity:
+        reserve_stock(cart, product_type, product, quantity - cart_product.quantity)
+    else:
+        release_stock(cart, product_type, product, cart_product.quantity - quantity)
+
+    final_price = product.price * quantity
+    CartProduct.objects.filter(pk=cart_product.pk).update(quantity=quantity, final_price=final_price)
+    apply_cart_delta(cart, locked_cart, quantity - cart_product.quantity, final_price - cart_product.final_price)
+    return True
+
+
+@transaction.atomic
+def remove_product_from_cart(cart, product_type, product):
+    """Remove ``product`` from ``cart``, return False if it is not in the cart."""
+    if cart.pk is None:
+        return False
+
+    locked_cart = lock_cart(cart)
+    cart_product = get_cart_product_for_update(cart, product_type, product)
+    if cart_product is None:
+        return False
+
+    cart_product.delete()
+    release_stock(cart, product_type, product)
+    apply_cart_delta(cart, locked_cart, -cart_product.quantity, -cart_product.final_price)
+    return True
+
+
+@transaction.atomic
+def place_order(cart, order):
+    """
+    Save ``order`` for the contents of ``cart`` and close the cart.
+
+    Every cart line is copied into an ``OrderItem`` at the current product
+    price with a single bulk insert and follow-up work is queued for the task
+    worker, return False if the cart is empty. Raise OutOfStock if a line can no longer be served.
+    """
+    if cart.pk is None:
+        return False
+    lock_cart(cart)
+    # Lines whose product has been deleted since are dropped.
+    cart_products = [cart_product for cart_product in get_cart_products(cart) if cart_product.content_object is not None]
+    if not cart_products:
+        return False
+    claim_cart_stock(cart, cart_products)
+
+    # Lines are charged at the current price. Lines whose price changed after
+    # they were added are repriced, so the items, the lines and the cart agree.
+    repriced = []
+    for cart_product in cart_products:
+        final_price = cart_product.content_object.price * cart_product.quantity
+        if cart_product.final_price != final_price:
+            cart_product.final_price = final_price
+            repriced.append(cart_product)
+    CartProduct.objects.bulk_update(repriced, ['final_price'])
+
+    order.cart = cart
+    order.save()
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            product_type=cart_product.content_object._meta.model_name,
+            object_id=cart_product.object_id,
+            title=cart_product.content_object.title,
+            unit_price=cart_product.content_object.price,
+            quantity=cart_product.quantity,
+            final_price=cart_product.final_price
+        )
+        for cart_product in cart_products
+    ])
+    cart.in_order = True
+    cart.total_products = sum(cart_product.quantity for cart_product in cart_products)
+    cart.final_price = sum(cart_product.final_price for cart_product in cart_products)
+    Cart.objects.filter(pk=cart.pk).update(
+        in_order=True, total_products=cart.total_products, final_price=cart.final_price
+    )
+    order.customer.orders.add(order)
+    enqueue(send_order_confirmation, {'order_id': order.pk}, idempotency_key='order_confirmation:%d' % order.pk)
+    return True
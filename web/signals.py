@@ -0,0 +1,83 @@
+import logging
+
+from django.contrib.auth.signals import user_logged_in
+from django.core.signals import request_started
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .catalog import remove_catalog_entry, sync_catalog_entry
+from .images import generate_variants, has_variants
+from .instrumentation import instrument_connections
+from .models import Category
+from .registry import product_types
+from .search import index_product, unindex_product
+from .services import merge_session_cart
+
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_MODELS = tuple(product_types.models())
+
+
+def invalidate_left_sidebar(sender, **kwargs):
+    # Drop the cached counts only once the change is visible to other
+    # connections, otherwise a concurrent request could re-cache stale data.
+    transaction.on_commit(Category.objects.invalidate_left_sidebar)
+
+
+for model in PRODUCT_MODELS + (Category,):
+    post_save.connect(invalidate_left_sidebar, sender=model, dispatch_uid='sidebar_save_%s' % model._meta.model_name)
+    post_delete.connect(invalidate_left_sidebar, sender=model, dispatch_uid='sidebar_delete_%s' % model._meta.model_name)
+
+
+def update_catalog(sender, instance, raw=False, **kwargs):
+    if not raw:
+        sync_catalog_entry(instance)
+
+
+def remove_from_catalog(sender, instance, **kwargs):
+    remove_catalog_entry(instance)
+
+
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_product(instance)
+
+
+def remove_from_search_index(sender, instance, **kwargs):
+    unindex_product(instance)
+
+
+def update_image_variants(sender, instance, raw=False, **kwargs):
+    name = instance.image.name
+    if raw or not name or has_variants(name):
+        return
+
+    def generate():
+        try:
+            generate_variants(name)
+        except (OSError, ValueError):
+            logger.exception('Could not generate variants of %s', name)
+
+    transaction.on_commit(generate)
+
+
+for model in PRODUCT_MODELS:
+    post_save.connect(update_image_variants, sender=model, dispatch_uid='image_variants_%s' % model._meta.model_name)
+    post_save.connect(update_catalog, sender=model, dispatch_uid='catalog_save_%s' % model._meta.model_name)
+    post_delete.connect(remove_from_catalog, sender=model, dispatch_uid='catalog_delete_%s' % model._meta.model_name)
+    post_save.connect(update_search_index, sender=model, dispatch_uid='search_save_%s' % model._meta.model_name)
+    post_delete.connect(remove_from_search_index, sender=model, dispatch_uid='search_delete_%s' % model._meta.model_name)
+
+
+@receiver(user_logged_in, dispatch_uid='merge_session_cart')
+def merge_anonymous_cart(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        merge_session_cart(request, user)
+
+
+@receiver(request_started, dispatch_uid='instrument_connections')
+def instrument_request_connections(sender, **kwargs):
+    # Sent from the thread that runs sync views, under ASGI too.
+    instrument_connections()
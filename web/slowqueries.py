@@ -0,0 +1,163 @@
+import json
+import logging
+import re
+from time import monotonic, perf_counter
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+from .metrics import get_current_route
+from .queries import fingerprint, get_origin
+
+
+# Written as one JSON document per line to the rotating SLOW_QUERY_LOG.
+logger = logging.getLogger('web.slowqueries')
+
+MAX_PARAMS = 50
+MAX_PARAM_LENGTH = 200
+
+FULL_SCAN_RE = re.compile(r'\bSCAN (?!.*\bUSING (?:COVERING )?INDEX\b)|\bSeq Scan\b|\bALL\b')
+SORT_RE = re.compile(r'\bUSE TEMP B-TREE\b|\bUsing filesort\b|\bUsing temporary\b|\bSort\b')
+COLUMN_RE = re.compile(r'[`"]?(\w+)[`"]?\.[`"]?(\w+)[`"]?\s*(?:=|<|>|!=|\bIN\b|\bLIKE\b|\bIS\b|\bBETWEEN\b)', re.I)
+WHERE_RE = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)', re.I | re.S)
+ORDER_RE = re.compile(r'\bORDER BY\b(.*?)(?:\bLIMIT\b|$)', re.I | re.S)
+ORDER_COLUMN_RE = re.compile(r'[`"]?(\w+)[`"]?\.[`"]?(\w+)[`"]?')
+
+
+def format_params(params):
+    if params is None:
+        return None
+    return [str(param)[:MAX_PARAM_LENGTH] for param in list(params)[:MAX_PARAMS]]
+
+
+class SlowQueryLogger:
+    """
+    Persistent ``execute_wrapper`` that logs queries slower than
+    ``SLOW_QUERY_THRESHOLD_MS`` with the route, the calling code and the plan.
+
+    Every query shape is explained at most once per ``SLOW_QUERY_EXPLAIN_INTERVAL``
+    seconds, so a slow hot query does not double the load it already causes.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+        self.explained = {}
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        start = perf_counter()
+        result = execute(sql, params, many, context)
+        duration = perf_counter() - start
+        if duration >= self.threshold:
+            self.log(sql, params, many, duration)
+        return result
+
+    def log(self, sql, params, many, duration):
+        shape = fingerprint(sql)
+        entry = {
+            'time': timezone.now().isoformat(),
+            'database': self.connection.alias,
+            'duration_ms': round(duration * 1000, 3),
+            'route': get_current_route(),
+            'origin': get_origin(),
+            'fingerprint': shape,
+            'sql': sql,
+            'params': None if many else format_params(params),
+            'explain': None
+        }
+        if not many and sql.lstrip()[:6].upper() == 'SELECT' and self.should_explain(shape):
+            entry['explain'] = self.explain(sql, params)
+        logger.info(json.dumps(entry, default=str))
+
+    def should_explain(self, shape):
+        now = monotonic()
+        if now - self.explained.get(shape, -settings.SLOW_QUERY_EXPLAIN_INTERVAL) < settings.SLOW_QUERY_EXPLAIN_INTERVAL:
+            return False
+        self.explained[shape] = now
+        return True
+
+    def explain(self, sql, params):
+        self.explaining = True
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('%s %s' % (self.connection.ops.explain_query_prefix(), sql), params)
+                return [' | '.join(str(value) for value in row) for row in cursor.fetchall()]
+        except Exception as exc:
+            return ['EXPLAIN failed: %s' % exc]
+        finally:
+            self.explaining = False
+
+
+def install_slow_query_logger(connection):
+    if settings.SLOW_QUERY_THRESHOLD_MS is None:
+        return
+    if not any(isinstance(wrapper, SlowQueryLogger) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(SlowQueryLogger(connection))
+
+
+def read_slow_query_log(path, backups):
+    """Yield the entries of the log and its rotated backups, oldest first."""
+    for name in ['%s.%d' % (path, number) for number in range(backups, 0, -1)] + [path]:
+        try:
+            log_file = open(name)
+        except FileNotFoundError:
+            continue
+        with log_file:
+            for line in log_file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def get_index_prefixes():
+    """Return {table: set of columns that lead at least one index}."""
+    prefixes = {}
+    for model in apps.get_models(include_auto_created=True):
+        opts = model._meta
+        columns = prefixes.setdefault(opts.db_table, set())
+        for field in opts.concrete_fields:
+            if field.primary_key or field.unique or field.db_index:
+                columns.add(field.column)
+        for index in opts.indexes:
+            columns.add(opts.get_field(index.fields[0].lstrip('-')).column)
+        for constraint in opts.constraints:
+            fields = getattr(constraint, 'fields', None)
+            if fields:
+                columns.add(opts.get_field(fields[0]).column)
+        for fields in opts.unique_together:
+            columns.add(opts.get_field(fields[0]).column)
+    return prefixes
+
+
+def get_index_hints(sql, plan, index_prefixes):
+    """Guess which indexes a slow query is missing from its plan and the columns it filters and sorts on."""
+    plan = '\n'.join(plan or ())
+    full_scan = bool(FULL_SCAN_RE.search(plan))
+    sort = bool(SORT_RE.search(plan))
+    if not full_scan and not sort:
+        return []
+
+    hints = []
+    where = WHERE_RE.search(sql)
+    filtered = COLUMN_RE.findall(where.group(1)) if where else []
+    if full_scan:
+        for table, column in dict.fromkeys(filtered):
+            if column not in index_prefixes.get(table, {column}):
+                hints.append('full scan, no index starts with %s.%s' % (table, column))
+        if not hints:
+            hints.append('full scan')
+    if sort:
+        order = ORDER_RE.search(sql)
+        columns = ORDER_COLUMN_RE.findall(order.group(1)) if order else []
+        if columns:
+            hints.append('sort without an index, consider an index ending with the ORDER BY columns %s' % (
+                ', '.join('%s.%s' % column for column in dict.fromkeys(columns))
+            ))
+        else:
+            hints.append('sort without an index')
+    return hints
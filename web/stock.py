@@ -0,0 +1,149 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import StockReservation
+
+
+# Seconds a cart holds its units without any activity on the line.
+RESERVATION_TIMEOUT = 15 * 60
+
+# Lock order everywhere below is reservation rows first, product row second,
+# so cart requests and the expiry job can not deadlock each other.
+
+
+class OutOfStock(Exception):
+
+    def __init__(self, product):
+        super().__init__('Sorry, %s is out of stock' % product.title)
+        self.product = product
+
+
+def take_stock(model, product_id, quantity):
+    """
+    Decrement the stock of a product if at least ``quantity`` units are left.
+
+    A single conditional UPDATE checks and writes at once, so concurrent buyers
+    of a hot product never read-then-write and never oversell.
+    """
+    return model._base_manager.filter(pk=product_id, stock__gte=quantity).update(stock=F('stock') - quantity) == 1
+
+
+def give_back_stock(model, product_id, quantity):
+    model._base_manager.filter(pk=product_id, stock__isnull=False).update(stock=F('stock') + quantity)
+
+
+def restock(model, product_id, quantity):
+    """
+    Add ``quantity`` delivered units to the stock of a product, an untracked
+    product starts being tracked. Return False if the product does not exist.
+
+    Product.save() never writes the stock of an existing product, this delta is
+    how deliveries get in without losing concurrent reservations.
+    """
+    return model._base_manager.filter(pk=product_id).update(stock=Coalesce('stock', 0) + quantity) == 1
+
+
+def reserve_stock(cart, product_type, product, quantity):
+    """Hold ``quantity`` more units of ``product`` for ``cart`` or raise OutOfStock, call inside a transaction."""
+    if product.stock is None or quantity <= 0:
+        return
+
+    filters = dict(cart=cart, content_type_id=product_type.content_type_id, object_id=product.id)
+    expires_at = timezone.now() + timedelta(seconds=RESERVATION_TIMEOUT)
+    updated = StockReservation.objects.filter(**filters).update(quantity=F('quantity') + quantity, expires_at=expires_at)
+    if not updated:
+        StockReservation.objects.create(quantity=quantity, expires_at=expires_at, **filters)
+
+    if not take_stock(product_type.model, product.id, quantity):
+        raise OutOfStock(product)
+
+
+def release_stock(cart, product_type, product, quantity=None):
+    """Give back up to ``quantity`` reserved units of ``product``, all of them by default."""
+    reservation = StockReservation.objects.select_for_update().filter(
+        cart=cart, content_type_id=product_type.content_type_id, object_id=product.id
+    ).first()
+    if reservation is None:
+        return
+
+    released = reservation.quantity if quantity is None else min(quantity, reservation.quantity)
+    if released == reservation.quantity:
+        reservation.delete()
+    else:
+        StockReservation.objects.filter(pk=reservation.pk).update(quantity=F('quantity') - released)
+    give_back_stock(product_type.model, product.id, released)
+
+
+def move_reservations(source, target):
+    """Hand the reservations of cart ``source`` over to cart ``target``."""
+    existing = {
+        (content_type_id, object_id): pk
+        for pk, content_type_id, object_id in StockReservation.objects.filter(cart=target).values_list(
+            'pk', 'content_type_id', 'object_id'
+        )
+    }
+    moved = []
+    for reservation in StockReservation.objects.select_for_update().filter(cart=source):
+        pk = existing.get((reservation.content_type_id, reservation.object_id))
+        if pk is None:
+            moved.append(reservation.pk)
+        else:
+            StockReservation.objects.filter(pk=pk).update(quantity=F('quantity') + reservation.quantity)
+            reservation.delete()
+    if moved:
+        StockReservation.objects.filter(pk__in=moved).update(cart=target)
+
+
+def claim_cart_stock(cart, cart_products):
+    """
+    Turn the reservations of ``cart`` into sold units at checkout.
+
+    Lines whose reservation expired in the meantime are reserved again, raise
+    OutOfStock if that is no longer possible.
+    """
+    reserved = {
+        (reservation.content_type_id, reservation.object_id): reservation.quantity
+        for reservation in StockReservation.objects.select_for_update().filter(cart=cart)
+    }
+    for cart_product in cart_products:
+        product = cart_product.content_object
+        if product.stock is None:
+            continue
+        missing = cart_product.quantity - reserved.get((cart_product.content_type_id, cart_product.object_id), 0)
+        if missing > 0 and not take_stock(type(product), product.id, missing):
+            raise OutOfStock(product)
+        if missing < 0:
+            give_back_stock(type(product), product.id, -missing)
+    if reserved:
+        StockReservation.objects.filter(cart=cart).delete()
+
+
+def release_expired_reservations(batch_size=1000):
+    """
+    Give the units of up to ``batch_size`` expired reservations back, return
+    the number of reservations released.
+
+    Quantities are summed per product first, so a hot product takes a single
+    UPDATE per batch instead of one per abandoned cart.
+    """
+    with transaction.atomic():
+        expired = StockReservation.objects.filter(expires_at__lt=timezone.now()).order_by('expires_at').select_for_update(
+            skip_locked=connection.features.has_select_for_update_skip_locked
+        )
+        rows = list(expired.values_list('pk', 'content_type_id', 'object_id', 'quantity')[:batch_size])
+        if not rows:
+            return 0
+
+        totals = defaultdict(int)
+        for pk, content_type_id, object_id, quantity in rows:
+            totals[content_type_id, object_id] += quantity
+        StockReservation.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        for (content_type_id, object_id), quantity in sorted(totals.items()):
+            give_back_stock(ContentType.objects.get_for_id(content_type_id).model_class(), object_id, quantity)
+    return len(rows)
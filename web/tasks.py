@@ -0,0 +1,19 @@
+from django.core.mail import send_mail
+
+from .models import Order
+from .queue import task
+
+
+@task()
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related('customer__user').filter(pk=order_id).first()
+    if order is None or not order.customer.user.email:
+        return
+
+    lines = ['%s x%d - %s $' % (item.title, item.quantity, item.final_price) for item in order.items.order_by('id')]
+    send_mail(
+        'Order #%d' % order.id,
+        'Thank you for your order!\n\n%s\n\nOur manager will contact you soon.' % '\n'.join(lines),
+        None,
+        [order.customer.user.email]
+    )
@@ -0,0 +1,25 @@
+from django import template
+
+from web.images import IMAGE_VARIANTS, get_variant_url, has_variants
+
+register = template.Library()
+
+
+@register.filter
+def image_variant(image, variant):
+    if not image:
+        return ''
+    # Until the variants are generated, or if generating them failed, serve the original.
+    if not has_variants(image.name):
+        return image.url
+    return get_variant_url(image.name, variant)
+
+
+@register.filter
+def image_srcset(image):
+    if not image or not has_variants(image.name):
+        return ''
+    return ', '.join(
+        '%s %dw' % (get_variant_url(image.name, variant), width)
+        for variant, width in IMAGE_VARIANTS.items()
+    )
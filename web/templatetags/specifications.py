@@ -1,6 +1,9 @@
+from types import MappingProxyType
+
 from django import template
+from django.core.cache import cache
+from django.utils.html import conditional_escape
 from django.utils.safestring import mark_safe
-from web.models import Smartphone, SmartTV
 
 register = template.Library()
 
@@ -50,26 +53,45 @@ PRODUCT_SPEC = {
 }
 
 
-@register.filter
-def product_specifications(product):
-    model_name = product.__class__._meta.model_name
+# Rows shown only when the product attribute on the right is truthy.
+OPTIONAL_SPEC = {
+    'smartphone': {'Maximal SD card volume': 'sd'},
+    'smarttv': {'Built-in apps': 'built_in_apps'}
+}
+
+SPEC_CACHE_TIMEOUT = 60 * 60 * 24
+
 
-    if isinstance(product, Smartphone):
-        if not product.sd:
-            PRODUCT_SPEC[model_name].pop('Maximal SD card volume', None)
-        else:
-            PRODUCT_SPEC[model_name]['Maximal SD card volume'] = 'sd_volume'
+def build_spec_plan(model_name):
+    optional = OPTIONAL_SPEC.get(model_name, {})
+    return tuple(
+        (TABLE_ITEM.format(name=conditional_escape(name), value='{value}'), field, optional.get(name))
+        for name, field in PRODUCT_SPEC[model_name].items()
+    )
 
-    if isinstance(product, SmartTV):
-        if not product.built_in_apps:
-            PRODUCT_SPEC[model_name].pop('Built-in apps', None)
-        else:
-            PRODUCT_SPEC[model_name]['Built-in apps'] = 'built_in_apps'
 
+SPEC_PLANS = MappingProxyType({model_name: build_spec_plan(model_name) for model_name in PRODUCT_SPEC})
 
-    table_content = ''
-    
-    for name, value in PRODUCT_SPEC[model_name].items():
-        table_content += TABLE_ITEM.format(name=name, value=getattr(product, value))
 
-    return mark_safe(TABLE_HEAD + table_content + TABLE_TAIL)
\ No newline at end of file
+def render_specifications(product):
+    rows = ''.join(
+        row.format(value=conditional_escape(getattr(product, field)))
+        for row, field, condition in SPEC_PLANS[product._meta.model_name]
+        if condition is None or getattr(product, condition)
+    )
+    return TABLE_HEAD + rows + TABLE_TAIL
+
+
+@register.filter
+def product_specifications(product):
+    if product.pk is None or product.updated_at is None:
+        return mark_safe(render_specifications(product))
+
+    cache_key = 'web:specifications:%s:%s:%s' % (
+        product._meta.model_name, product.pk, product.updated_at.timestamp()
+    )
+    html = cache.get(cache_key)
+    if html is None:
+        html = render_specifications(product)
+        cache.set(cache_key, html, SPEC_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -0,0 +1,61 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Category, Headphones, Notebook, Order, Smartphone
+from ..registry import product_types
+from ..services import get_customer
+
+
+ORDER_DATA = {
+    'first_name': 'Test', 'last_name': 'User', 'phone': '+10000000000', 'address': 'Test street 1',
+    'order_type': 'pickup', 'delivery_date': '2030-01-01', 'order_comment': ''
+}
+
+
+def create_catalog():
+    categories = {
+        slug: Category.objects.create(name=name, slug=slug)
+        for name, slug in (('Notebooks', 'notebooks'), ('Smartphones', 'smartphones'), ('Headphones', 'headphones'))
+    }
+    for number in range(3):
+        Notebook.objects.create(
+            category=categories['notebooks'], slug='notebook-%d' % number, title='Notebook %d' % number,
+            description='Light notebook', price=Decimal('1000.00') + number, image='notebook.png',
+            display_type='IPS', processor_freq='3 GHz', diagonal='15.6"', video='GTX', ram='16 GB',
+            os='Windows', battery='8 h'
+        )
+        Smartphone.objects.create(
+            category=categories['smartphones'], slug='smartphone-%d' % number, title='Smartphone %d' % number,
+            description='Small smartphone', price=Decimal('500.00') + number, image='smartphone.png',
+            diagonal='6.1"', display_type='OLED', resolution='1080x2400', ram='4 GB', sd=True,
+            sd_volume='128 GB', battery='4000 mAh', main_cam='12 MP', frontal_cam='8 MP'
+        )
+        Headphones.objects.create(
+            category=categories['headphones'], slug='headphones-%d' % number, title='Headphones %d' % number,
+            description='Loud headphones', price=Decimal('50.00') + number, image='headphones.png',
+            speaker_freq='20 Hz', battery='20 h', connection_type='wireless'
+        )
+
+
+class CatalogTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+        cls.user = User.objects.create_user('customer', password='secret')
+        cls.customer = get_customer(cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_product(self, model_name, slug):
+        product_type = product_types.get(model_name)
+        return product_type, product_type.model.objects.get(slug=slug)
+
+    def build_order(self):
+        return Order(customer=self.customer, **dict(ORDER_DATA, delivery_date=timezone.now() + timedelta(days=7)))
@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+from django.urls import reverse
+
+from ..models import Cart, CartProduct
+from ..services import (
+    SESSION_CART_KEY, add_product_to_cart, change_cart_product_quantity, place_order, remove_product_from_cart
+)
+from .base import CatalogTestCase
+
+
+class CartServiceTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cart = Cart.objects.create(owner=self.customer)
+
+    def assertCartTotals(self, total_products, final_price):
+        cart = Cart.objects.get(pk=self.cart.pk)
+        self.assertEqual((cart.total_products, cart.final_price), (total_products, final_price))
+        self.assertEqual((self.cart.total_products, self.cart.final_price), (total_products, final_price))
+
+    def test_add_product(self):
+        product_type, notebook = self.get_product('notebook', 'notebook-0')
+        self.assertTrue(add_product_to_cart(self.cart, product_type, notebook))
+        self.assertFalse(add_product_to_cart(self.cart, product_type, notebook, 2))
+
+        cart_product = CartProduct.objects.get(cart=self.cart)
+        self.assertEqual((cart_product.quantity, cart_product.final_price), (3, Decimal('3000.00')))
+        self.assertCartTotals(3, Decimal('3000.00'))
+
+    def test_change_quantity(self):
+        product_type, notebook = self.get_product('notebook', 'notebook-1')
+        add_product_to_cart(self.cart, product_type, notebook)
+        self.assertTrue(change_cart_product_quantity(self.cart, product_type, notebook, 4))
+        self.assertEqual(CartProduct.objects.get(cart=self.cart).final_price, Decimal('4004.00'))
+        self.assertCartTotals(4, Decimal('4004.00'))
+
+        self.assertTrue(change_cart_product_quantity(self.cart, product_type, notebook, 0))
+        self.assertFalse(CartProduct.objects.filter(cart=self.cart).exists())
+        self.assertCartTotals(0, Decimal('0.00'))
+
+    def test_remove_product(self):
+        product_type, notebook = self.get_product('notebook', 'notebook-0')
+        phone_type, smartphone = self.get_product('smartphone', 'smartphone-0')
+        add_product_to_cart(self.cart, product_type, notebook)
+        add_product_to_cart(self.cart, phone_type, smartphone, 2)
+
+        self.assertTrue(remove_product_from_cart(self.cart, product_type, notebook))
+        self.assertFalse(remove_product_from_cart(self.cart, product_type, notebook))
+        self.assertCartTotals(2, Decimal('1000.00'))
+
+    def test_place_order_reprices_lines(self):
+        product_type, notebook = self.get_product('notebook', 'notebook-0')
+        add_product_to_cart(self.cart, product_type, notebook, 2)
+        notebook.price = Decimal('1100.00')
+        notebook.save()
+
+        order = self.build_order()
+        self.assertTrue(place_order(self.cart, order))
+        item = order.items.get()
+        self.assertEqual((item.unit_price, item.quantity, item.final_price), (Decimal('1100.00'), 2, Decimal('2200.00')))
+        self.assertCartTotals(2, Decimal('2200.00'))
+        self.assertTrue(Cart.objects.get(pk=self.cart.pk).in_order)
+
+
+class SessionCartMergeTests(CatalogTestCase):
+
+    def add_to_cart(self, slug):
+        return self.client.get(reverse('add_to_cart', kwargs={'ct_model': 'notebook', 'slug': slug}))
+
+    def test_merge_on_login(self):
+        product_type, notebook = self.get_product('notebook', 'notebook-0')
+        cart = Cart.objects.create(owner=self.customer)
+        add_product_to_cart(cart, product_type, notebook)
+
+        self.add_to_cart('notebook-0')
+        self.add_to_cart('notebook-1')
+        anonymous_cart_id = self.client.session[SESSION_CART_KEY]
+        self.assertTrue(self.client.login(username='customer', password='secret'))
+
+        self.assertFalse(Cart.objects.filter(pk=anonymous_cart_id).exists())
+        self.assertNotIn(SESSION_CART_KEY, self.client.session)
+        lines = dict(CartProduct.objects.filter(cart=cart).values_list('object_id', 'quantity'))
+        _, other_notebook = self.get_product('notebook', 'notebook-1')
+        self.assertEqual(lines, {notebook.pk: 2, other_notebook.pk: 1})
+        cart.refresh_from_db()
+        self.assertEqual((cart.total_products, cart.final_price), (3, Decimal('3001.00')))
+
+    def test_login_without_session_cart(self):
+        self.assertTrue(self.client.login(username='customer', password='secret'))
+        self.assertFalse(Cart.objects.exists())
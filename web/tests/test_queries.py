@@ -0,0 +1,62 @@
+from django.test import override_settings
+from django.urls import reverse
+
+from ..models import Notebook, Order
+from ..queries import QueryBudgetExceeded, query_budget
+from .base import ORDER_DATA, CatalogTestCase
+
+
+@override_settings(QUERY_CHECK_ENABLED=True, QUERY_CHECK_RAISE=True)
+class QueryBudgetTests(CatalogTestCase):
+    """
+    Every request runs under QueryCheckMiddleware in raise mode, so a view over
+    its QUERY_BUDGETS entry or with an N+1 pattern fails the test.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def add_to_cart(self, slug='notebook-0'):
+        return self.client.get(reverse('add_to_cart', kwargs={'ct_model': 'notebook', 'slug': slug}))
+
+    def test_catalog_pages(self):
+        for url in (
+            reverse('index'),
+            reverse('category_detail', kwargs={'slug': 'notebooks'}),
+            reverse('category_detail', kwargs={'slug': 'notebooks'}) + '?ram=16',
+            reverse('product_detail', kwargs={'ct_model': 'notebook', 'slug': 'notebook-0'}),
+            reverse('search') + '?q=notebook'
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_cart_pages(self):
+        self.assertEqual(self.client.get(reverse('cart')).status_code, 200)
+        for slug in ('notebook-0', 'notebook-1', 'notebook-2'):
+            self.assertEqual(self.add_to_cart(slug).status_code, 302)
+        self.assertEqual(self.client.get(reverse('cart')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('checkout')).status_code, 200)
+
+        kwargs = {'ct_model': 'notebook', 'slug': 'notebook-0'}
+        response = self.client.post(reverse('change_quantity', kwargs=kwargs), {'quantity': '3'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.get(reverse('delete_from_cart', kwargs=kwargs)).status_code, 302)
+
+    def test_make_order(self):
+        self.add_to_cart('notebook-0')
+        self.add_to_cart('notebook-1')
+        response = self.client.post(reverse('make_order'), ORDER_DATA)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.get().items.count(), 2)
+
+    def test_over_budget_fails(self):
+        with override_settings(QUERY_BUDGETS={'index': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('index'))
+
+    def test_repeated_queries_fail(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'Query repeated 4 times'):
+            with query_budget(threshold=3):
+                for slug in ('notebook-0', 'notebook-1', 'notebook-2', 'notebook-0'):
+                    Notebook.objects.get(slug=slug)
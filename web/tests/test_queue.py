@@ -0,0 +1,56 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Task
+from ..queue import claim_tasks, enqueue, run_task, task
+
+
+calls = []
+
+
+@task(name='tests.record', max_attempts=2)
+def record(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise ValueError('failed on purpose')
+
+
+class QueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run_task(self):
+        queued = enqueue(record, {'value': 1})
+        claimed = claim_tasks()
+        self.assertEqual([claimed_task.pk for claimed_task in claimed], [queued.pk])
+        self.assertEqual(claim_tasks(), [])
+
+        self.assertTrue(run_task(claimed[0]))
+        self.assertEqual(calls, [1])
+        self.assertEqual(Task.objects.get(pk=queued.pk).status, Task.STATUS_DONE)
+
+    def test_idempotency_key(self):
+        first = enqueue(record, {'value': 1}, idempotency_key='record:1')
+        second = enqueue(record, {'value': 2}, idempotency_key='record:1')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_delay(self):
+        enqueue(record, {'value': 1}, delay=60)
+        self.assertEqual(claim_tasks(), [])
+
+    def test_retry_then_fail(self):
+        queued = enqueue(record, {'value': 1, 'fail': True})
+        self.assertFalse(run_task(claim_tasks()[0]))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.STATUS_PENDING, 1))
+        self.assertGreater(queued.run_after, timezone.now())
+
+        Task.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        with self.assertLogs('web.queue', 'ERROR'):
+            self.assertFalse(run_task(claim_tasks()[0]))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.STATUS_FAILED, 2))
+        self.assertIn('failed on purpose', queued.last_error)
+        self.assertEqual(calls, [1, 1])
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.db import router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+
+from ..middleware import ReplicaPinMiddleware
+from ..models import Cart, Category, LatestProducts, Notebook
+from ..routers import PRIMARY
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    The router only picks aliases here, the replica is never connected to. Not
+    a TestCase, its transaction around every test would pin all reads.
+    """
+
+    def run_request(self, view, cookies=None):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        routes = []
+
+        def get_response(request):
+            routes.extend(view())
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(get_response)(request)
+        return routes, response
+
+    def test_reads_outside_of_requests(self):
+        self.assertEqual(router.db_for_read(Category), PRIMARY)
+
+    def test_catalog_reads(self):
+        routes, response = self.run_request(
+            lambda: [router.db_for_read(Category), router.db_for_read(Notebook), router.db_for_read(Cart)]
+        )
+        self.assertEqual(routes, ['replica', 'replica', PRIMARY])
+        self.assertNotIn(ReplicaPinMiddleware.COOKIE_NAME, response.cookies)
+
+    def test_write_pins_request_and_client(self):
+        routes, response = self.run_request(
+            lambda: [router.db_for_read(Category), router.db_for_write(Cart), router.db_for_read(Category)]
+        )
+        self.assertEqual(routes, ['replica', PRIMARY, PRIMARY])
+        cookie = response.cookies[ReplicaPinMiddleware.COOKIE_NAME]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+    def test_pin_cookie(self):
+        routes, response = self.run_request(
+            lambda: [router.db_for_read(Category)], cookies={ReplicaPinMiddleware.COOKIE_NAME: '1'}
+        )
+        self.assertEqual(routes, [PRIMARY])
+        self.assertNotIn(ReplicaPinMiddleware.COOKIE_NAME, response.cookies)
+
+    def test_atomic_block(self):
+        def view():
+            with transaction.atomic():
+                routes = [router.db_for_read(Category)]
+            return routes + [router.db_for_read(Category)]
+
+        routes, response = self.run_request(view)
+        self.assertEqual(routes, [PRIMARY, 'replica'])
+
+    def test_cached_reads_use_primary(self):
+        # Sent to the replica, these reads would fail on the missing alias.
+        routes, response = self.run_request(lambda: [
+            Category.objects.count_categories_for_left_sidebar(),
+            LatestProducts.objects.get_latest_products({'notebook': 2, 'smartphone': 2})
+        ])
+        self.assertEqual(routes, [[], []])
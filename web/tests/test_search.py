@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from ..models import Category, Headphones
+from ..search import search_products
+from .base import CatalogTestCase
+
+
+class SearchTests(CatalogTestCase):
+
+    def search(self, query, **kwargs):
+        products, has_next = search_products(query, **kwargs)
+        return [product.slug for product in products], has_next
+
+    def test_all_words_match(self):
+        slugs, has_next = self.search('smartphone oled')
+        self.assertEqual(sorted(slugs), ['smartphone-0', 'smartphone-1', 'smartphone-2'])
+        self.assertEqual(self.search('notebook oled'), ([], False))
+
+    def test_last_word_matches_prefix(self):
+        slugs, has_next = self.search('light noteb')
+        self.assertEqual(sorted(slugs), ['notebook-0', 'notebook-1', 'notebook-2'])
+        self.assertEqual(self.search('noteb light'), ([], False))
+
+    def test_title_outranks_description(self):
+        Headphones.objects.create(
+            category=Category.objects.get(slug='headphones'), slug='light-headphones', title='Light headphones',
+            description='Quiet headphones', price=Decimal('60.00'), image='headphones.png',
+            speaker_freq='20 Hz', battery='20 h', connection_type='wired'
+        )
+        slugs, has_next = self.search('light')
+        self.assertEqual(slugs[0], 'light-headphones')
+        self.assertEqual(sorted(slugs[1:]), ['notebook-0', 'notebook-1', 'notebook-2'])
+
+    def test_pages(self):
+        first, has_next = self.search('notebook', per_page=2)
+        self.assertEqual((len(first), has_next), (2, True))
+        second, has_next = self.search('notebook', page=2, per_page=2)
+        self.assertEqual((len(second), has_next), (1, False))
+        self.assertFalse(set(first) & set(second))
+
+    def test_empty_query(self):
+        self.assertEqual(self.search('the a'), ([], False))
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib import admin
+from django.test import RequestFactory
+from django.utils import timezone
+
+from ..models import Cart, CartProduct, Notebook, Smartphone, StockReservation
+from ..services import add_product_to_cart, change_cart_product_quantity, place_order, remove_product_from_cart
+from ..stock import OutOfStock, release_expired_reservations, restock
+from .base import CatalogTestCase
+
+
+class StockTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cart = Cart.objects.create(owner=self.customer)
+        self.product_type, self.notebook = self.get_product('notebook', 'notebook-0')
+        Notebook.objects.filter(pk=self.notebook.pk).update(stock=3)
+        self.notebook.refresh_from_db()
+
+    def get_stock(self):
+        return Notebook.objects.values_list('stock', flat=True).get(pk=self.notebook.pk)
+
+    def test_reserve_and_release(self):
+        add_product_to_cart(self.cart, self.product_type, self.notebook, 2)
+        self.assertEqual(self.get_stock(), 1)
+        self.assertEqual(StockReservation.objects.get(cart=self.cart).quantity, 2)
+
+        change_cart_product_quantity(self.cart, self.product_type, self.notebook, 1)
+        self.assertEqual(self.get_stock(), 2)
+        remove_product_from_cart(self.cart, self.product_type, self.notebook)
+        self.assertEqual(self.get_stock(), 3)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_out_of_stock_rolls_back(self):
+        add_product_to_cart(self.cart, self.product_type, self.notebook, 2)
+        with self.assertRaises(OutOfStock):
+            add_product_to_cart(self.cart, self.product_type, self.notebook, 2)
+        self.assertEqual(self.get_stock(), 1)
+        self.assertEqual(CartProduct.objects.get(cart=self.cart).quantity, 2)
+        self.assertEqual(StockReservation.objects.get(cart=self.cart).quantity, 2)
+
+    def test_untracked_stock(self):
+        phone_type, smartphone = self.get_product('smartphone', 'smartphone-0')
+        add_product_to_cart(self.cart, phone_type, smartphone, 10)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_release_expired_reservations(self):
+        add_product_to_cart(self.cart, self.product_type, self.notebook, 2)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertEqual(self.get_stock(), 3)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_order_claims_reservations(self):
+        add_product_to_cart(self.cart, self.product_type, self.notebook, 2)
+        self.assertTrue(place_order(self.cart, self.build_order()))
+        self.assertEqual(self.get_stock(), 1)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_save_keeps_reservations(self):
+        stale = Notebook.objects.get(pk=self.notebook.pk)
+        add_product_to_cart(self.cart, self.product_type, self.notebook, 2)
+        stale.price = Decimal('1200.00')
+        stale.save()
+        self.assertEqual(self.get_stock(), 1)
+        self.assertEqual(Notebook.objects.get(pk=self.notebook.pk).price, Decimal('1200.00'))
+
+        stale.stock = 10
+        stale.save(update_fields=['stock', 'price'])
+        self.assertEqual(self.get_stock(), 1)
+
+    def test_restock(self):
+        add_product_to_cart(self.cart, self.product_type, self.notebook, 2)
+        self.assertTrue(restock(Notebook, self.notebook.pk, 5))
+        self.assertEqual(self.get_stock(), 6)
+
+        _, smartphone = self.get_product('smartphone', 'smartphone-0')
+        self.assertTrue(restock(Smartphone, smartphone.pk, 4))
+        self.assertEqual(Smartphone.objects.values_list('stock', flat=True).get(pk=smartphone.pk), 4)
+        self.assertFalse(restock(Notebook, 0, 1))
+
+    def test_stock_readonly_in_admin(self):
+        model_admin = admin.site._registry[Notebook]
+        request = RequestFactory().get('/')
+        self.assertIn('stock', model_admin.get_readonly_fields(request, self.notebook))
+        self.assertNotIn('stock', model_admin.get_readonly_fields(request))
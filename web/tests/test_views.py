@@ -0,0 +1,53 @@
+from decimal import Decimal
+
+from django.urls import reverse
+
+from ..models import Notebook
+from .base import CatalogTestCase
+
+
+class ProductDetailTests(CatalogTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('product_detail', kwargs={'ct_model': 'notebook', 'slug': 'notebook-0'})
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_cached_until_updated(self):
+        etag = self.client.get(self.url)['ETag']
+        # update() leaves updated_at alone, so the cached page is still served.
+        Notebook.objects.filter(slug='notebook-0').update(title='Renamed notebook')
+        self.assertNotContains(self.client.get(self.url), 'Renamed notebook')
+
+        Notebook.objects.get(slug='notebook-0').save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Renamed notebook')
+
+    def test_sidebar_counts_change_version(self):
+        etag = self.client.get(self.url)['ETag']
+        notebook = Notebook.objects.get(slug='notebook-1')
+        # The test images do not exist, so generating their variants logs an error.
+        with self.assertLogs('web.signals', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            Notebook.objects.create(
+                category=notebook.category, slug='notebook-new', title='New notebook', description='New',
+                price=Decimal('900.00'), image='notebook.png', display_type='IPS', processor_freq='3 GHz',
+                diagonal='14"', video='GTX', ram='8 GB', os='Windows', battery='6 h'
+            )
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unknown_product(self):
+        url = reverse('product_detail', kwargs={'ct_model': 'notebook', 'slug': 'missing'})
+        self.assertEqual(self.client.get(url).status_code, 404)
+        url = reverse('product_detail', kwargs={'ct_model': 'tablet', 'slug': 'notebook-0'})
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.urls import path
+from . import async_views
 from .views import (
     ProductDetailView, 
     CategoryDetailView, 
@@ -8,17 +10,30 @@ from .views import (
     ChangeQuantityView, 
     DeleteFromCartView, 
     CheckoutView,
-    MakeOrderView
+    MakeOrderView,
+    SearchView,
+    MetricsView
 )
 
+if settings.ASYNC_CATALOG_VIEWS:
+    index_view = async_views.index
+    product_detail_view = async_views.product_detail
+    category_detail_view = async_views.category_detail
+else:
+    index_view = IndexView.as_view()
+    product_detail_view = ProductDetailView.as_view()
+    category_detail_view = CategoryDetailView.as_view()
+
 urlpatterns = [
-    path('', IndexView.as_view(), name='index'),
-    path('products/<str:ct_model>/<str:slug>/', ProductDetailView.as_view(), name='product_detail'),
-    path('category/<str:slug>/', CategoryDetailView.as_view(), name='category_detail'),
+    path('', index_view, name='index'),
+    path('products/<str:ct_model>/<str:slug>/', product_detail_view, name='product_detail'),
+    path('category/<str:slug>/', category_detail_view, name='category_detail'),
+    path('search/', SearchView.as_view(), name='search'),
     path('cart/', CartView.as_view(), name='cart'),
     path('add_to_cart/<str:ct_model>/<str:slug>', AddProductToCartView.as_view(), name='add_to_cart'),
     path('change_quantity/<str:ct_model>/<str:slug>', ChangeQuantityView.as_view(), name='change_quantity'),
     path('delete_from_cart/<str:ct_model>/<str:slug>', DeleteFromCartView.as_view(), name='delete_from_cart'),
     path('checkout/', CheckoutView.as_view(), name='checkout'),
-    path('make_order/', MakeOrderView.as_view(), name='make_order')
+    path('make_order/', MakeOrderView.as_view(), name='make_order'),
+    path('metrics', MetricsView.as_view(), name='metrics')
 ]
\ No newline at end of file
@@ -1,6 +1,12 @@
+import re
+from decimal import Decimal
+
 from django.db import models
 
 
+SPEC_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)?')
+
+
 def recalc_cart_fin_price(cart):
     cart_data = cart.products.aggregate(models.Sum('final_price'), models.Sum('quantity'))
     if cart_data.get('final_price__sum') is not None:
@@ -8,4 +14,46 @@ def recalc_cart_fin_price(cart):
     else: 
         cart.final_price = 0
     cart.total_products = cart_data.get('quantity__sum')
-    cart.save()
\ No newline at end of file
+    cart.save()
+
+
+def get_cart_products(cart):
+    """
+    Return the products of a cart with their ``content_object`` already loaded.
+
+    Rows are grouped by content type and every product table is hit by a
+    single ``IN`` query, so rendering a cart costs the same number of queries
+    whatever its size.
+    """
+    if cart.pk is None:
+        return []
+    return list(cart.products.order_by('id').prefetch_related('content_object'))
+
+
+def keyset_paginate(queryset, after=None, per_page=12):
+    """
+    Return one page of ``queryset`` ordered by descending id together with the
+    cursor of the next page (``None`` on the last page).
+
+    Pages are located with ``id < after`` instead of OFFSET, so deep pages cost
+    the same primary key range scan as the first one.
+    """
+    try:
+        after = int(after)
+    except (TypeError, ValueError):
+        after = None
+    if after is not None:
+        queryset = queryset.filter(id__lt=after)
+    items = list(queryset.order_by('-id')[:per_page + 1])
+    next_cursor = items[per_page - 1].id if len(items) > per_page else None
+    return items[:per_page], next_cursor
+
+
+def parse_spec_number(value):
+    """Return the first number of a free-text spec such as '15.6"' or '8 GB', or None."""
+    if not value:
+        return None
+    match = SPEC_NUMBER_RE.search(str(value))
+    if match is None:
+        return None
+    return Decimal(match.group().replace(',', '.'))
@@ -1,11 +1,24 @@
-from django.db import transaction
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
 from django.shortcuts import redirect, render, HttpResponseRedirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag
 from django.views.generic import DetailView, View
 from django.contrib import messages
 from .models import *
 from .mixins import CategoryDetailMixin, CartMixin
+from .registry import product_types
+from .routers import PRIMARY
+from .search import search_products
+from .stock import OutOfStock
 from .forms import OrderForm
-from .utils import recalc_cart_fin_price
+from .metrics import render_metrics
+from .services import add_product_to_cart, change_cart_product_quantity, get_customer, place_order, remove_product_from_cart
+from .utils import get_cart_products
 
 
 class IndexView(View):
@@ -25,23 +38,60 @@ class IndexView(View):
 
 
 class ProductDetailView(CategoryDetailMixin, DetailView):
-    
-    CT_MODEL_MODEL_CLASS = {
-        'notebook' : Notebook,
-        'smartphone' : Smartphone,
-        'smarttv' : SmartTV,
-        'headphones' : Headphones
-    }
+
+    RESPONSE_CACHE_TIMEOUT = 60 * 5
 
     def dispatch(self, request, *args, **kwargs):
-        self.model = self.CT_MODEL_MODEL_CLASS[kwargs['ct_model']]
-        self.queryset = self.model._base_manager.all()
+        product_type = product_types.get(kwargs['ct_model'])
+        if product_type is None:
+            raise Http404('Unknown product type %s' % kwargs['ct_model'])
+        self.model = product_type.model
+        # The rendered page and its version are cached, so they are read from
+        # the primary and a lagging replica can not cache an old page.
+        self.queryset = self.model._base_manager.using(PRIMARY).select_related('category')
         return super().dispatch(request, *args, **kwargs)
     
     context_object_name = 'product'
     template_name = 'product_detail.html'
     slug_url_kwarg = 'slug'
 
+    def get(self, request, *args, **kwargs):
+        updated_at = self.queryset.filter(slug=kwargs['slug']).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            raise Http404('No %s found matching the query' % self.model._meta.verbose_name)
+
+        version = self.get_version(
+            self.model._meta.model_name, kwargs['slug'], updated_at, Category.objects.get_categories_for_left_sidebar()
+        )
+        render_page = super().get
+        return self.get_cached_response(
+            request, version, updated_at, lambda: render_page(request, *args, **kwargs).render().content
+        )
+
+    @staticmethod
+    def get_version(model_name, slug, updated_at, categories):
+        # The page also shows the sidebar counts, so they are part of the version.
+        return md5(repr((model_name, slug, updated_at.timestamp(), categories)).encode()).hexdigest()
+
+    @classmethod
+    def get_cached_response(cls, request, version, updated_at, render_content):
+        etag = quote_etag(version)
+        last_modified = int(updated_at.timestamp())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            cache_key = 'web:product_detail:%s' % version
+            content = cache.get(cache_key)
+            if content is None:
+                content = render_content()
+                cache.set(cache_key, content, cls.RESPONSE_CACHE_TIMEOUT)
+            response = HttpResponse(content)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['ct_model'] = self.model._meta.model_name
@@ -61,11 +111,34 @@ class CategoryDetailView(CategoryDetailMixin, DetailView):
         return context
 
 
+class SearchView(View):
+
+    RESULTS_PER_PAGE = 12
+
+    def get(self, request, *args, **kwargs):
+        query = request.GET.get('q', '').strip()
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+
+        products, has_next = search_products(query, page, self.RESULTS_PER_PAGE)
+        context = {
+            'search_query': query,
+            'products': products,
+            'page': page,
+            'has_next': has_next,
+            'categories': Category.objects.get_categories_for_left_sidebar()
+        }
+        return render(request, 'search.html', context)
+
+
 class CartView(CartMixin, View):
 
     def get(self, request, *args, **kwargs):
         context = {
             'cart': self.cart,
+            'cart_products': get_cart_products(self.cart),
             'categories':  Category.objects.get_categories_for_left_sidebar()
         }
         return render(request, 'cart.html', context)
@@ -74,28 +147,14 @@ class CartView(CartMixin, View):
 class AddProductToCartView(CartMixin, View):
 
     def get(self, request, *args, **kwargs):
-        
-        ct_model = kwargs.get('ct_model')
-        slug = kwargs.get('slug')
-
-        product = ContentType.objects.get(model=ct_model).model_class().objects.get(slug=slug)
-
-        cart_product, created = CartProduct.objects.get_or_create(
-            user=self.cart.owner, 
-            cart=self.cart, 
-            object_id=product.id, 
-            content_type=ContentType.objects.get(model=ct_model)
-        )
+        product_type, product = self.get_product(kwargs.get('ct_model'), kwargs.get('slug'))
 
-        if created:
-            self.cart.products.add(cart_product)
+        try:
+            add_product_to_cart(self.get_cart_for_update(), product_type, product)
+        except OutOfStock as exc:
+            messages.add_message(request, messages.INFO, str(exc))
         else:
-            cart_product.quantity += 1
-            cart_product.save()
-
-        recalc_cart_fin_price(self.cart) # <=== recalculates final price and product quantity of a cart
-
-        messages.add_message(request, messages.INFO, "Item successfuly added to your cart")
+            messages.add_message(request, messages.INFO, "Item successfuly added to your cart")
 
         return HttpResponseRedirect('/cart')
 
@@ -103,25 +162,19 @@ class AddProductToCartView(CartMixin, View):
 class ChangeQuantityView(CartMixin, View):
     
     def post(self, request, *args, **kwargs):
-        if request.POST.get('quantity'):
-            ct_model = kwargs.get('ct_model') 
-            slug = kwargs.get('slug')
-
-            product = ContentType.objects.get(model=ct_model).model_class().objects.get(slug=slug)
-
-            cart_product = CartProduct.objects.get(
-                user=self.cart.owner, 
-                cart=self.cart, 
-                object_id=product.id, 
-                content_type=ContentType.objects.get(model=ct_model)
-            )
+        try:
+            quantity = int(request.POST.get('quantity'))
+        except (TypeError, ValueError):
+            quantity = None
 
-            cart_product.quantity = int(request.POST.get('quantity'))
-            cart_product.save()
+        if quantity is not None:
+            product_type, product = self.get_product(kwargs.get('ct_model'), kwargs.get('slug'))
 
-            recalc_cart_fin_price(self.cart)
-            
-            messages.add_message(request, messages.INFO, "Item's quantity changed")
+            try:
+                if change_cart_product_quantity(self.cart, product_type, product, quantity):
+                    messages.add_message(request, messages.INFO, "Item's quantity changed")
+            except OutOfStock as exc:
+                messages.add_message(request, messages.INFO, str(exc))
 
         return HttpResponseRedirect('/cart')
 
@@ -129,24 +182,10 @@ class ChangeQuantityView(CartMixin, View):
 class DeleteFromCartView(CartMixin, View):
 
     def get(self, request, *args, **kwargs):
-        ct_model = kwargs.get('ct_model') 
-        slug = kwargs.get('slug')
+        product_type, product = self.get_product(kwargs.get('ct_model'), kwargs.get('slug'))
 
-        product = ContentType.objects.get(model=ct_model).model_class().objects.get(slug=slug)
-
-        cart_product = CartProduct.objects.get(
-            user=self.cart.owner, 
-            cart=self.cart, 
-            object_id=product.id, 
-            content_type=ContentType.objects.get(model=ct_model)
-        )
-
-        self.cart.products.remove(cart_product)
-        cart_product.delete()
-
-        recalc_cart_fin_price(self.cart)
-        
-        messages.add_message(request, messages.INFO, "Item successfuly removed from your cart")
+        if remove_product_from_cart(self.cart, product_type, product):
+            messages.add_message(request, messages.INFO, "Item successfuly removed from your cart")
 
         return HttpResponseRedirect('/cart')
 
@@ -157,6 +196,7 @@ class CheckoutView(CartMixin, View):
         form = OrderForm(request.POST or None)
         context = {
             'cart': self.cart,
+            'cart_products': get_cart_products(self.cart),
             'categories':  Category.objects.get_categories_for_left_sidebar(),
             'form': form
         }
@@ -165,27 +205,38 @@ class CheckoutView(CartMixin, View):
 
 class MakeOrderView(CartMixin, View):
 
-    @transaction.atomic
     def post(self, request, *args, **kwargs):
         form = OrderForm(request.POST or None)
-        customer = Customer.objects.get(user=request.user)
+        if not request.user.is_authenticated:
+            messages.add_message(request, messages.INFO, 'Please sign in to place your order.')
+            return HttpResponseRedirect('/checkout/')
         if form.is_valid():
             new_order = form.save(commit=False)
-            new_order.customer = customer
-            new_order.first_name = form.cleaned_data['first_name']
-            new_order.last_name = form.cleaned_data['last_name']
-            new_order.phone = form.cleaned_data['phone']
-            new_order.address = form.cleaned_data['address']
-            new_order.order_type = form.cleaned_data['order_type']
-            new_order.delivery_date = form.cleaned_data['delivery_date']
-            new_order.order_comment = form.cleaned_data['order_comment']
-            new_order.save()
-            self.cart.in_order = True
-            self.cart.save()
-            new_order.cart = self.cart
-            new_order.save()
-            customer.orders.add(new_order)
-            messages.add_message(request, messages.INFO, 'Thank you for your order! Our manager will contact you soon.')
-            return HttpResponseRedirect('/')
+            new_order.customer = self.cart.owner or get_customer(request.user)
+            try:
+                placed = place_order(self.cart, new_order)
+            except OutOfStock as exc:
+                messages.add_message(request, messages.INFO, str(exc))
+                return HttpResponseRedirect('/cart/')
+            if placed:
+                messages.add_message(request, messages.INFO, 'Thank you for your order! Our manager will contact you soon.')
+                return HttpResponseRedirect('/')
+            messages.add_message(request, messages.INFO, 'Your cart is empty.')
+            return HttpResponseRedirect('/cart/')
         messages.add_message(request, messages.INFO, 'Failed to place your order, there must be something wrong with order data.')
-        return HttpResponseRedirect('/checkout/')
\ No newline at end of file
+        return HttpResponseRedirect('/checkout/')
+
+
+class MetricsView(View):
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_allowed(request):
+            raise Http404
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    def is_allowed(self, request):
+        if settings.METRICS_TOKEN:
+            authorization = request.META.get('HTTP_AUTHORIZATION', '')
+            if constant_time_compare(authorization, 'Bearer %s' % settings.METRICS_TOKEN):
+                return True
+        return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS or request.user.is_staff